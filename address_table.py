@@ -0,0 +1,43 @@
+import threading
+
+
+class AddressTable:
+
+
+    def __init__(self):
+        # every address string is stored once, transactions hold its position in _addresses
+        self._ids       = {}
+        self._addresses = []
+        self._lock      = threading.Lock()
+
+
+    def __len__(self):
+        return len(self._addresses)
+
+
+    def intern(self, address):
+        address_id = self._ids.get(address)
+        if address_id is None:
+            with self._lock:
+                address_id = self._ids.get(address)
+                if address_id is None:
+                    address_id = len(self._addresses)
+                    self._addresses.append(address)
+                    self._ids[address] = address_id
+
+        return address_id
+
+
+    def find(self, address):
+        # id of an address already seen, None otherwise, never adds one
+        return self._ids.get(address)
+
+
+    def lookup(self, address_id):
+        return self._addresses[address_id]
+
+
+# the table every Transaction interns its sender and recipient in
+ADDRESSES = AddressTable()
+# and the one for the public keys signed transactions reveal, each ~324 hex digits
+PUBLIC_KEYS = AddressTable()
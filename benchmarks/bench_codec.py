@@ -0,0 +1,78 @@
+# Compares the JSON block records against the binary codec for size, encode and decode time.
+#
+#   python benchmarks/bench_codec.py --blocks 2000 --transactions 20
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from block                   import Block
+from transaction             import Transaction
+from utility.codec_util      import encode_block
+from utility.difficulty_util import INITIAL_TARGET
+
+
+def build_blocks(length, transactions_per_block):
+
+    # field sizes as the node writes them: 40 hex addresses, 128 hex hashes,
+    # 256 hex signatures of 1024 bit keys and 324 hex DER public keys
+    blocks = []
+    start = datetime(2020, 1, 1)
+    for index in range(1, length + 1):
+        transactions = [Transaction(os.urandom(20).hex(), os.urandom(20).hex(), n * 0.25,
+                                    os.urandom(128).hex(), os.urandom(162).hex())
+                        for n in range(transactions_per_block)]
+        transactions.append(Transaction('MINING', os.urandom(20).hex(), 10))
+        blocks.append(Block(index, os.urandom(64).hex(), transactions, index * 37,
+                            str(start + timedelta(seconds=index * 61.5)), INITIAL_TARGET, os.urandom(64).hex()))
+
+    return blocks
+
+
+def timed(function, items, repeat):
+
+    # best of repeat runs, the others mostly measure the rest of the machine
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = [function(item) for item in items]
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    return results, best
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--blocks', type=int, default=2000)
+    parser.add_argument('--transactions', type=int, default=20, help='transactions per block besides the reward')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    blocks = build_blocks(args.blocks, args.transactions)
+
+    # the encoders are called directly, Block caches to_json and to_bytes
+    records, json_encode = timed(lambda block: json.dumps(block.to_dict()).encode(), blocks, args.repeat)
+    encoded, binary_encode = timed(encode_block, blocks, args.repeat)
+    _, json_decode = timed(lambda record: Block.from_dict(json.loads(record)), records, args.repeat)
+    decoded, binary_decode = timed(Block.from_bytes, encoded, args.repeat)
+    assert all(block.to_json() == copy.to_json() for block, copy in zip(blocks, decoded))
+
+    json_size = sum(len(record) for record in records)
+    binary_size = sum(len(record) for record in encoded)
+    print('{} blocks of {} transactions'.format(len(blocks), args.transactions + 1))
+    print('{:>8} {:>12} {:>12} {:>12}'.format('format', 'bytes', 'encode s', 'decode s'))
+    print('{:>8} {:>12} {:>12.3f} {:>12.3f}'.format('json', json_size, json_encode, json_decode))
+    print('{:>8} {:>12} {:>12.3f} {:>12.3f}'.format('binary', binary_size, binary_encode, binary_decode))
+    print('{:>8} {:>12.2f} {:>12.2f} {:>12.2f}'.format('ratio', binary_size / json_size,
+                                                      binary_encode / json_encode, binary_decode / json_decode))
+
+
+if __name__ == '__main__':
+    main()
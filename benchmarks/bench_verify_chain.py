@@ -0,0 +1,89 @@
+# Times serial against process pool verification of a synthetic chain of signed transactions,
+# with signatures checked as the node does.
+#
+#   python benchmarks/bench_verify_chain.py --blocks 5000 --workers 1 2 4 8 16 32
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from block                   import Block
+from transaction             import Transaction
+from utility.difficulty_util import MAX_ADJUSTMENT, RETARGET_WINDOW, BLOCK_INTERVAL, target_for_height
+from utility.hash_util       import hash_block, hash_transaction, merkle_root
+from utility.verify_util     import parallel_first_invalid_block
+from verification            import Verification
+from wallet                  import Wallet
+
+
+def build_chain(length, transactions_per_block, senders):
+
+    wallets = []
+    for _ in range(senders):
+        wallet = Wallet()
+        wallet.create_keys()
+        wallets.append(wallet)
+    # a sender's key only comes with its first transaction
+    revealed = set()
+    # recipient and amount only depend on the position in the block, so each signature is made once
+    signatures = {}
+
+    chain = [Block(0, '', [], 0, 0)]
+    start = datetime(2020, 1, 1)
+    for index in range(1, length):
+        # blocks arrive slower than BLOCK_INTERVAL, so retargeting soon makes mining them cheap
+        timestamp = str(start + timedelta(seconds=index * BLOCK_INTERVAL * MAX_ADJUSTMENT))
+        transactions = []
+        for n in range(transactions_per_block):
+            wallet = wallets[(index * transactions_per_block + n) % senders]
+            recipient = '{:040x}'.format(n)
+            public_key = None if wallet.address in revealed else wallet.public_key
+            revealed.add(wallet.address)
+            if (wallet.address, n) not in signatures:
+                signatures[(wallet.address, n)] = wallet.sign_transaction(wallet.address, recipient, n)
+            transactions.append(Transaction(wallet.address, recipient, n, signatures[(wallet.address, n)], public_key))
+        transactions.append(Transaction('MINING', 'miner', 10))
+        block = Block(index, hash_block(chain[-1]), transactions, 0, timestamp,
+                      target_for_height(chain, index), merkle_root([hash_transaction(tx) for tx in transactions]))
+        midstate = Verification.header_midstate(block)
+        proof = 0
+        while not Verification.valid_proof_from_midstate(midstate, proof, block.target):
+            proof += 1
+        chain.append(block.with_proof(proof))
+
+    return chain
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--blocks', type=int, default=5000)
+    parser.add_argument('--transactions', type=int, default=4, help='transactions per block besides the reward')
+    parser.add_argument('--senders', type=int, default=16)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    chain = build_chain(args.blocks, args.transactions, args.senders)
+    print('built {} blocks in {:.1f}s on {} cores'.format(len(chain), time.perf_counter() - started, os.cpu_count()))
+
+    started = time.perf_counter()
+    assert Verification.first_invalid_block(chain, RETARGET_WINDOW, BLOCK_INTERVAL, check_signatures=True) is None
+    serial = time.perf_counter() - started
+    print('{:>8} {:>10} {:>8}'.format('workers', 'seconds', 'speedup'))
+    print('{:>8} {:>10.2f} {:>8.2f}'.format('serial', serial, 1.0))
+
+    for workers in args.workers:
+        started = time.perf_counter()
+        assert parallel_first_invalid_block(chain, RETARGET_WINDOW, BLOCK_INTERVAL, workers,
+                                            check_signatures=True) is None
+        elapsed = time.perf_counter() - started
+        print('{:>8} {:>10.2f} {:>8.2f}'.format(workers, elapsed, serial / elapsed))
+
+
+if __name__ == '__main__':
+    main()
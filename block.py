@@ -1,15 +1,97 @@
+import json
 from datetime import datetime
 
+from transaction        import Transaction
+from utility.codec_util import encode_block, read_header, read_transactions
+from utility.hash_util  import compute_block_hash
+
 class Block():
 
 
-    def __init__(self, index:, previous_hash, transactions, proof, time=str(datetime.utcnow())):
+    def __init__(self, index, previous_hash, transactions, proof, time=None, target=None, merkle_root=None):
         self.index = index
         self.previous_hash = previous_hash
-        self.timestamp = time
-        self.transactions = transactions
+        # stamp when the block is built, a default argument would be evaluated only once at import
+        self.timestamp = time if time is not None else str(datetime.utcnow())
+        self.transactions = tuple(transactions)
         self.proof = proof
+        # None for blocks from before per block targets, see utility.difficulty_util
+        self.target = target
+        # None for blocks from before header hashing, see utility.hash_util.hash_block
+        self.merkle_root = merkle_root
+
+        # filled in on first use, see hash, to_json and to_bytes
+        self._hash = None
+        self._json = None
+        self._bytes = None
+        self._frozen = True
+
+
+    def __setattr__(self, name, value):
+        # a block never changes once built, that is what makes caching its hash safe
+        if self.__dict__.get('_frozen'):
+            raise AttributeError('Block is immutable, build a new one instead')
+        super().__setattr__(name, value)
+
+
+    @property
+    def hash(self):
+        if self._hash is None:
+            self.__dict__['_hash'] = compute_block_hash(self)
+
+        return self._hash
+
+
+    def with_proof(self, proof):
+        return Block(self.index, self.previous_hash, self.transactions, proof,
+                     self.timestamp, self.target, self.merkle_root)
+
+
+    @staticmethod
+    def from_dict(block):
+        # fields added later are missing from older records
+        return Block(block['index'], block['previous_hash'],
+                     [Transaction.from_dict(tx) for tx in block['transactions']], block['proof'],
+                     block['timestamp'], block.get('target'), block.get('merkle_root'))
+
+
+    @staticmethod
+    def from_bytes(data):
+        # transactions are built straight from their decoded fields, no dicts in between
+        header, offset = read_header(data)
+        transactions, _ = read_transactions(data, offset, header['transaction_count'], data[0])
+
+        return Block(header['index'], header['previous_hash'], [Transaction(*fields) for fields in transactions],
+                     header['proof'], header['timestamp'], header['target'], header['merkle_root'])
+
+
+    def to_dict(self):
+        return {
+            'index': self.index,
+            'previous_hash': self.previous_hash,
+            'timestamp': self.timestamp,
+            'transactions': [tx.to_dict() for tx in self.transactions],
+            'proof': self.proof,
+            'target': self.target,
+            'merkle_root': self.merkle_root
+        }
+
+
+    def to_json(self):
+        # the canonical serialization, one line of the block log
+        if self._json is None:
+            self.__dict__['_json'] = json.dumps(self.to_dict())
+
+        return self._json
+
+
+    def to_bytes(self):
+        # compact binary form, see utility.codec_util
+        if self._bytes is None:
+            self.__dict__['_bytes'] = encode_block(self)
+
+        return self._bytes
 
 
     def __repr__(self):
-        return str(self.__dict__)
\ No newline at end of file
+        return str(self.to_dict())
\ No newline at end of file
@@ -0,0 +1,43 @@
+import json
+
+from block              import Block
+from utility.codec_util import encode_block
+
+
+class BlockHeader(Block):
+    # a stored block of which only the header stays in memory, its transactions
+    # are decoded when first used and may be dropped again, see BodyCache
+
+
+    def __init__(self, header, bodies):
+        self.index = header['index']
+        self.previous_hash = header['previous_hash']
+        self.timestamp = header['timestamp']
+        self.proof = header['proof']
+        # fields added later are missing from older records
+        self.target = header.get('target')
+        self.merkle_root = header.get('merkle_root')
+        self._bodies = bodies
+
+        self._hash = None
+        self._frozen = True
+
+
+    @property
+    def transactions(self):
+        return self._bodies.get(self.index)
+
+
+    def __reduce__(self):
+        # a worker process gets the whole block, it has no body cache of its own
+        return (Block, (self.index, self.previous_hash, self.transactions, self.proof,
+                        self.timestamp, self.target, self.merkle_root))
+
+
+    def to_json(self):
+        # not cached, that would keep the transactions in memory after all
+        return json.dumps(self.to_dict())
+
+
+    def to_bytes(self):
+        return encode_block(self)
@@ -0,0 +1,269 @@
+import json
+import mmap
+import os
+import struct
+
+from block              import Block
+from durability         import DurableLog, atomic_write
+from utility.codec_util import read_block, read_header
+
+# every block after the genesis block, oldest first, records follow each other without a delimiter
+# a record is either a JSON line or the binary encoding of utility.codec_util, see BlockStore
+BLOCK_LOG_FILE = 'blocks.log'
+# a fixed width (offset, length) entry per record of the block log, the block at height h is entry h - 1
+BLOCK_INDEX_FILE = 'blocks.idx'
+
+_entry = struct.Struct('<QI')
+
+
+def _map(path):
+
+    # read only view of the whole file, an empty file cannot be mapped
+    with open(path, mode='rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _decode(record):
+
+    # JSON records start with '{', which is never a codec version
+    if record[:1] == b'{':
+        return Block.from_dict(json.loads(record))
+
+    return Block.from_bytes(record)
+
+
+def _decode_header(record):
+
+    # a JSON record has to be parsed whole, a binary one stops before its transactions
+    if record[:1] == b'{':
+        header = json.loads(record)
+        del header['transactions']
+        return header
+    header, _ = read_header(record)
+
+    return header
+
+
+def _scan(data, offset, size):
+
+    # (offset, length) of every whole record in data[offset:size], stops at a record cut short by a crash
+    entries = []
+    while offset < size:
+        try:
+            if data[offset] == ord('{'):
+                end = data.find(b'\n', offset, size)
+                if end < 0:
+                    break
+                end += 1
+                json.loads(data[offset:end])
+            else:
+                _, end = read_block(data, offset)
+        except (ValueError, IndexError, KeyError, struct.error):
+            break
+        if end > size:
+            break
+        entries.append((offset, end - offset))
+        offset = end
+
+    return entries
+
+
+class BlockStore:
+
+
+    def __init__(self, path=BLOCK_LOG_FILE, index_path=BLOCK_INDEX_FILE, durability=None, binary=False):
+        self.path       = path
+        self.index_path = index_path
+        # format of new records, either kind is read back; json.loads still decodes a whole block faster,
+        # binary records are smaller and let read_header stop before the transactions
+        self.binary     = binary
+        self.log        = DurableLog(path, durability)
+        self.index      = DurableLog(index_path, durability)
+        # number of indexed blocks, set by recover
+        self._count     = 0
+        # read only maps of both files, remapped once they have grown past the mapped part
+        self._data_map  = None
+        self._index_map = None
+
+
+    def __len__(self):
+        return self._count
+
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+
+    def recover(self, reindex=False):
+        # brings the index in line with the log: records appended but not yet indexed are indexed
+        # and a torn record at the end is cut off
+        # a log from before the index has none and is indexed from the start, and so is one the index
+        # doesn't fit or, with reindex, one it points into wrongly
+        self._unmap()
+        if not self.exists():
+            # an index left over from a removed log would have new records appended after its entries
+            if os.path.exists(self.index_path):
+                self.index.replace(b'')
+            self._count = 0
+            return
+        data_size = os.path.getsize(self.path)
+        index_size = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+
+        # entries are written after their record, so only the last one needs a look: if it doesn't hold
+        # a whole record, the log was replaced or cut short since and no entry can be trusted, nor can
+        # what follows it be cut off as torn
+        count = 0 if reindex else index_size // _entry.size
+        start = 0
+        self._index_map = _map(self.index_path) if count > 0 else None
+        self._data_map = _map(self.path)
+        if count > 0:
+            offset, length = self._entry(count - 1)
+            if offset + length <= data_size and _scan(self._data_map, offset, offset + length) == [(offset, length)]:
+                start = offset + length
+            else:
+                count = 0
+
+        tail = _scan(self._data_map, start, data_size) if start < data_size else []
+        end = tail[-1][0] + tail[-1][1] if tail else start
+        # copied before either file is unmapped for the truncate or the replace
+        index = self._index_map[:count * _entry.size] if count > 0 else b''
+
+        if end < data_size:
+            self._unmap()
+            self.log.truncate(end)
+        if tail or count * _entry.size != index_size:
+            self._unmap()
+            self.index.replace(index + b''.join(_entry.pack(offset, length) for offset, length in tail))
+        self._count = count + len(tail)
+
+
+    def load(self):
+        return self._load(self.read)
+
+
+    def load_headers(self):
+        # every field but the transactions, as dicts by height starting at 1
+        return self._load(self.read_header)
+
+
+    def _load(self, read):
+        self.recover()
+        try:
+            return [read(height) for height in range(1, self._count + 1)]
+        except (ValueError, IndexError, KeyError, TypeError, struct.error):
+            # the index points into a log that was replaced since, every record found by a scan decodes
+            print('Block index does not match the block log, rebuilding it')
+            self.recover(reindex=True)
+
+            return [read(height) for height in range(1, self._count + 1)]
+
+
+    def read(self, height):
+        # one index lookup and one slice of the mapped log, no other record is parsed
+        return _decode(self._record(height))
+
+
+    def read_header(self, height):
+        return _decode_header(self._record(height))
+
+
+    def _record(self, height):
+        if not 1 <= height <= self._count:
+            raise IndexError('no block at height {}'.format(height))
+        offset, length = self._entry(height - 1)
+
+        return self._data(offset + length)[offset:offset + length]
+
+
+    def append(self, block):
+        # earlier records are never touched, so this costs the same at any chain length
+        # a block is committed right away, resetting the transaction log relies on it being stored
+        # returns whether it was, a failed append is cut off again so recover can't index it later
+        record = self._encode(block)
+        log_size = os.path.getsize(self.path) if self.exists() else 0
+        try:
+            self.log.append(record, wait=False)
+            self.log.commit()
+            self.index.append(_entry.pack(log_size, len(record)), wait=False)
+            self.index.commit()
+        except (IOError, OSError):
+            print('Saving block failed!')
+            self._cut_off(log_size)
+            return False
+        self._count += 1
+
+        return True
+
+
+    def _cut_off(self, log_size):
+        # back to log_size bytes of log and an entry per stored block, as far as the disk lets us
+        try:
+            self._unmap()
+            if self.exists():
+                self.log.truncate(log_size)
+            if os.path.exists(self.index_path):
+                self.index.truncate(self._count * _entry.size)
+        except (IOError, OSError):
+            pass
+
+
+    def write_all(self, blocks):
+        records = [self._encode(block) for block in blocks]
+        entries = []
+        offset = 0
+        for record in records:
+            entries.append(_entry.pack(offset, len(record)))
+            offset += len(record)
+
+        # the index is emptied first, an index left over from another log would point into the new one
+        self._unmap()
+        self.index.replace(b'')
+        atomic_write(self.path, b''.join(records), self.log.durability)
+        self.index.replace(b''.join(entries))
+        self._count = len(records)
+
+
+    def _encode(self, block):
+        if self.binary:
+            return block.to_bytes()
+
+        return (block.to_json() + '\n').encode()
+
+
+    def close(self):
+        self._unmap()
+        self.log.close()
+        self.index.close()
+
+
+    def _entry(self, position):
+        end = (position + 1) * _entry.size
+        if self._index_map is None or len(self._index_map) < end:
+            self._index_map = self._remap(self._index_map, self.index_path)
+
+        return _entry.unpack_from(self._index_map, position * _entry.size)
+
+
+    def _data(self, end):
+        if self._data_map is None or len(self._data_map) < end:
+            self._data_map = self._remap(self._data_map, self.path)
+
+        return self._data_map
+
+
+    def _remap(self, old_map, path):
+        if old_map is not None:
+            old_map.close()
+
+        return _map(path)
+
+
+    def _unmap(self):
+        # some platforms refuse to replace or truncate a mapped file
+        for old_map in (self._data_map, self._index_map):
+            if old_map is not None:
+                old_map.close()
+        self._data_map = None
+        self._index_map = None
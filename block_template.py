@@ -0,0 +1,63 @@
+from utility.hash_util import hash_pair, hash_string_512, hash_transaction, serialize_transaction
+
+
+class BlockTemplate:
+
+
+    def __init__(self, transactions=()):
+        # serialized open transactions in admission order and their total size in bytes
+        self.serialized = []
+        self.size       = 0
+        # merkle tree over the open transactions, _levels[0] holds the transaction hashes
+        # and every level above is kept up to date as transactions are added
+        self._levels    = [[]]
+
+        for tx in transactions:
+            self.add(tx)
+
+
+    def __len__(self):
+        return len(self._levels[0])
+
+
+    def add(self, transaction):
+        data = serialize_transaction(transaction)
+        self.serialized.append(data)
+        self.size += len(data)
+        self._levels[0].append(hash_string_512(data))
+
+        # only the nodes on the path from the new hash to the root change
+        level = 0
+        position = len(self._levels[0]) - 1
+        while len(self._levels[level]) > 1:
+            if level + 1 == len(self._levels):
+                self._levels.append([])
+            nodes = self._levels[level]
+            parent = position // 2
+            left = nodes[2 * parent]
+            right = nodes[2 * parent + 1] if 2 * parent + 1 < len(nodes) else left
+            if parent < len(self._levels[level + 1]):
+                self._levels[level + 1][parent] = hash_pair(left, right)
+            else:
+                self._levels[level + 1].append(hash_pair(left, right))
+            position = parent
+            level += 1
+
+
+    def merkle_root(self, reward_transaction):
+        # root over the open transactions followed by the reward, the same value
+        # utility.hash_util.merkle_root gives, without adding the reward to the tree
+        node = hash_transaction(reward_transaction)
+        position = len(self._levels[0])
+        size = position + 1
+        level = 0
+        while size > 1:
+            if position % 2 == 1:
+                node = hash_pair(self._levels[level][position - 1], node)
+            else:
+                node = hash_pair(node, node)
+            position //= 2
+            size = (size + 1) // 2
+            level += 1
+
+        return node
@@ -1,103 +1,369 @@
-from functools import reduce
-
 import hashlib as hl
 import json
+import os
 import pickle
-
-from block             import Block
-from transaction       import Transaction
-from utility.hash_util import hash_block
-from verification      import Verification
-from wallet            import Wallet
-
-# The reward we give to miners (for creating a new block)
-MINING_REWARD = 10
+import threading
+
+from block                   import Block
+from block_header            import BlockHeader
+from block_store             import BlockStore
+from block_template          import BlockTemplate
+from body_cache              import BodyCache, BODY_BUDGET
+from durability              import Durability, atomic_write
+from ledger_index            import Balances, LedgerIndex, SNAPSHOT_INTERVAL
+from mining_job              import MiningJob
+from transaction             import Transaction
+from transaction_log         import TransactionLog
+from utility.difficulty_util import RETARGET_WINDOW, BLOCK_INTERVAL, target_for_height
+from utility.hash_util       import hash_block
+from utility.mining_util     import parallel_proof_of_work
+from utility.signature_util  import verify_signatures
+from utility.verify_util     import parallel_first_invalid_block
+from verification            import MINING_REWARD, Verification
+from wallet                  import Wallet
+
+# transactions per page of get_transaction_history
+HISTORY_PAGE_SIZE = 50
+# height and block hash up to which an earlier run verified the block log
+VERIFIED_STATE_FILE = 'blockchain.verified'
+# confirmed balance of every address as of a block, saved in lazy mode, see load_balances
+BALANCES_FILE = 'blockchain.balances'
+# block hashes trusted without verification, by height
+CHECKPOINTS = {}
 
 
 class Blockchain:
 
 
-    def __init__(self, hosting_node_id):
+    def __init__(self, hosting_node_id, mining_workers=None, verify_workers=None,
+                 retarget_window=RETARGET_WINDOW, block_interval=BLOCK_INTERVAL, checkpoints=CHECKPOINTS,
+                 snapshot_interval=SNAPSHOT_INTERVAL, durability=None, lazy=False, body_budget=BODY_BUDGET):
         genesis_block          = Block(0, '', [], 0, 0)
         self.chain             = [genesis_block]
         self.open_transactions = []
-        self.load_data()
+        # serialized open transactions and their merkle tree, kept up to date by add_transaction
+        self.template          = BlockTemplate()
+        # confirmed balances and open debits per address, see get_balance
+        self.snapshot_interval = snapshot_interval
+        self._ledger           = LedgerIndex(snapshot_interval=snapshot_interval)
+        # in lazy mode, the balances get_balance reads until something needs the whole ledger
+        self._balances         = None
+        # bumped whenever the tip or the open transactions change, see mining_snapshot
+        self.revision          = 0
+        # guards chain and open_transactions against a background MiningJob
+        self._lock             = threading.RLock()
+        # chain[:verified_height + 1] passed verification while its tip hashed to verified_tip_hash
+        self.verified_height   = 0
+        self.verified_tip_hash = None
+        self.checkpoints       = checkpoints
+        # how writes reach the disk, group commit by default
+        self.durability        = durability if durability is not None else Durability()
+        # lazy loading keeps only block headers in memory, with at most body_budget transactions decoded
+        self.lazy              = lazy
+        # every block after the genesis block, appended as it is mined
+        # binary records only pay off when headers are read without their transactions
+        self.block_store       = BlockStore(durability=self.durability, binary=lazy)
+        # open transactions, appended as they are admitted and emptied once mined
+        self.transaction_log   = TransactionLog(durability=self.durability)
+        self.bodies            = BodyCache(self.block_store, body_budget)
 
         self.hosting_node      = hosting_node_id
+        # number of processes searching for a proof, 1 keeps the serial loop
+        self.mining_workers    = mining_workers if mining_workers is not None else (os.cpu_count() or 1)
+        # number of processes checking the chain when all of it has to be verified
+        self.verify_workers    = verify_workers if verify_workers is not None else (os.cpu_count() or 1)
+        # difficulty is retargeted every retarget_window blocks towards one block per block_interval seconds
+        self.retarget_window   = retarget_window
+        self.block_interval    = block_interval
+        self.load_data()
 
 
     def load_data(self):
+        # blockchain.txt from before the block log is imported once
+        if not self.block_store.exists():
+            self.import_legacy_data()
+
+        if self.lazy:
+            headers = self.block_store.load_headers()
+            self.chain = self.chain[:1] + [BlockHeader(header, self.bodies) for header in headers]
+        else:
+            self.chain = self.chain[:1] + self.block_store.load()
+        # reading every transaction is what lazy loading avoids, so then the ledger waits for its first use
+        # and balances come from a saved copy instead
+        # either comes first, the open transactions are checked against the keys the chain revealed
+        self.open_transactions = []
+        self._ledger = None if self.lazy else LedgerIndex(self.chain, snapshot_interval=self.snapshot_interval)
+        self._balances = self.load_balances() if self.lazy else None
+        self.open_transactions = self.load_open_transactions(len(self.chain) - 1)
+        for tx in self.open_transactions:
+            self.balances.add_pending(tx)
+        self.template = BlockTemplate(self.open_transactions)
+        self.load_verified_state()
+
+
+    def load_open_transactions(self, tip_height):
+        # older versions admitted unsigned transactions, and a block mining one would fail verification
+        transactions = self.transaction_log.load(tip_height)
+        signing_keys = self.signing_keys(transactions)
+        signatures_valid = verify_signatures(transactions, self.verify_workers, keys=signing_keys)
+        revealed = set()
+        signed = [self._reveal_once(tx, public_key, revealed)
+                  for tx, public_key, signature_valid in zip(transactions, signing_keys, signatures_valid)
+                  if signature_valid]
+        if len(signed) != len(transactions):
+            print('Dropped {} open transactions without a valid signature'.format(len(transactions) - len(signed)))
+        # and logs from before keys were revealed once carry them with every transaction
+        if len(signed) != len(transactions) or any(kept is not tx for kept, tx in zip(signed, transactions)):
+            self.transaction_log.reset(tip_height)
+            for tx in signed:
+                self.transaction_log.append(tx, wait=False)
+            self.transaction_log.sync()
+
+        return signed
+
+
+    def signing_keys(self, transactions):
+        # the key to check each of transactions against, None for the one it carries: a sender's key
+        # comes with its first transaction, in a block, an open transaction or earlier in transactions
+        balances = self.balances
+        revealed = {}
+        keys = []
+        for tx in transactions:
+            if tx.public_key_id is not None:
+                keys.append(None)
+                if tx.sender not in revealed and Wallet.key_matches(tx.public_key, tx.sender):
+                    revealed[tx.sender] = tx.public_key
+            else:
+                known_key = balances.known_key(tx.sender)
+                keys.append(known_key if known_key is not None else revealed.get(tx.sender))
+
+        return keys
+
+
+    def _reveal_once(self, transaction, public_key, revealed):
+        # the transaction as it is kept, with its sender's key only if neither the chain nor an earlier
+        # open transaction revealed it, revealed holds the senders of those not yet in the ledger
+        if self.balances.known_key(transaction.sender) is not None or transaction.sender in revealed:
+            public_key = None
+        elif public_key is None:
+            public_key = transaction.public_key
+        if public_key is not None:
+            revealed.add(transaction.sender)
+
+        return transaction if public_key == transaction.public_key else transaction.with_public_key(public_key)
+
+
+    def import_legacy_data(self):
         try:
             with open('blockchain.txt', mode='r') as f:
                 file_content = f.readlines()
-                blockchain = json.loads(file_content[0][:-1])
-                # convert transactions to OrderedDict
-                updated_blockchain = []
-                for block in blockchain:
-                    converted_tx = [Transaction(
-                        tx['sender'], tx['recipient'], tx['amount']) for tx in block['transactions']]
-                    updated_block = Block(
-                        block['index'], block['previous_hash'], converted_tx, block['proof'], block['timestamp'])
-                    updated_blockchain.append(updated_block)
-                self.chain = updated_blockchain
-                open_transactions = json.loads(file_content[1])
-                # again, convert transactions to OrderedDict
-                updated_transactions = []
-                for tx in open_transactions:
-                    updated_transaction = Transaction(
-                        tx['sender'], tx['recipient'], tx['amount'])
-                    updated_transactions.append(updated_transaction)
-                self.open_transactions = updated_transactions
+                blockchain = [Block.from_dict(block) for block in json.loads(file_content[0][:-1])]
+                open_transactions = [Transaction.from_dict(tx) for tx in json.loads(file_content[1])]
         except (IOError, IndexError):
+            return
+
+        self.block_store.write_all(blockchain[1:])
+        self.transaction_log.reset(len(blockchain) - 1)
+        for tx in open_transactions:
+            self.transaction_log.append(tx, wait=False)
+        self.transaction_log.sync()
+
+
+    def load_balances(self):
+        # balances saved by an earlier lazy run at the current tip, otherwise rebuilt from the block store
+        # a rebuild reads every transaction once but keeps none of them, bypassing the body cache
+        try:
+            with open(BALANCES_FILE, mode='r') as f:
+                state = json.loads(f.read())
+                if state['height'] == len(self.chain) - 1 and state['tip_hash'] == hash_block(self.chain[-1]):
+                    return Balances.from_dict(state['balances'])
+        except (IOError, ValueError, KeyError, TypeError, AttributeError):
             pass
 
+        balances = Balances()
+        for height in range(1, len(self.chain)):
+            balances.apply_block(self.block_store.read(height))
+        self.save_balances(balances)
+
+        return balances
+
 
-    def save_data(self):
+    def save_balances(self, balances):
         try:
-            with open('blockchain.txt', mode='w') as f:
-            	# cycle through all attribute for each block in chain
-            	#	cycling through all transactions for each block
-                saveable_chain = [block.__dict__ for block in 
-                				 [Block(block_elt.index, block_elt.previous_hash, 
-                				 	[tx.__dict__ for tx in block_elt.transactions], block_elt.proof, block_elt.timestamp) 
-                				 		for block_elt in self.chain]]
-                f.write(json.dumps(saveable_chain))
-                f.write('\n')
-                saveable_tx = [tx.__dict__ for tx in self.open_transactions]
-                f.write(json.dumps(saveable_tx))
-        except IOError:
-            print('Saving Failed!')
-
-
-    def proof_of_work(self):
-        last_block = self.chain[-1]
-        last_hash = hash_block(last_block)
+            state = {'height': len(self.chain) - 1, 'tip_hash': hash_block(self.chain[-1]),
+                     'balances': balances.to_dict()}
+            atomic_write(BALANCES_FILE, json.dumps(state).encode(), self.durability)
+        except (IOError, OSError):
+            print('Saving balances failed!')
+
+
+    @property
+    def balances(self):
+        # what get_balance reads: the ledger, or in lazy mode the saved balances until the ledger is built
+        with self._lock:
+            if self._ledger is None and self._balances is not None:
+                return self._balances
+
+            return self.ledger
+
+
+    @property
+    def ledger(self):
+        with self._lock:
+            if self._ledger is None:
+                self._ledger = LedgerIndex(self.chain, self.open_transactions, self.snapshot_interval)
+
+            return self._ledger
+
+
+    def load_verified_state(self):
+        # start from the highest block known to be good, recorded by an earlier run or checkpointed
+        self.verified_height = 0
+        self.verified_tip_hash = None
+        try:
+            with open(VERIFIED_STATE_FILE, mode='r') as f:
+                state = json.loads(f.read())
+                height, tip_hash = state['height'], state['tip_hash']
+                # if the block log was rewritten since, the recorded block is gone and everything gets verified
+                if height < len(self.chain) and hash_block(self.chain[height]) == tip_hash:
+                    self.verified_height = height
+                    self.verified_tip_hash = tip_hash
+        except (IOError, ValueError, KeyError, TypeError):
+            pass
+
+        # a chain that contradicts a checkpoint is rejected by verify_chain, none of it counts as verified
+        if self.contradicted_checkpoint() is not None:
+            self.verified_height = 0
+            self.verified_tip_hash = None
+            return
+        for height, checkpoint_hash in self.checkpoints.items():
+            if self.verified_height < height < len(self.chain):
+                self.verified_height = height
+                self.verified_tip_hash = checkpoint_hash
+
+
+    def contradicted_checkpoint(self):
+        # lowest height the chain reaches at which its block isn't the checkpointed one, None if there is none
+        mismatches = [height for height, checkpoint_hash in self.checkpoints.items()
+                      if 0 < height < len(self.chain) and hash_block(self.chain[height]) != checkpoint_hash]
+
+        return min(mismatches) if mismatches else None
+
+
+    def save_verified_state(self):
+        try:
+            state = {'height': self.verified_height, 'tip_hash': self.verified_tip_hash}
+            atomic_write(VERIFIED_STATE_FILE, json.dumps(state).encode(), self.durability)
+        except (IOError, OSError):
+            print('Saving verification state failed!')
+
+
+    def close(self):
+        # commit whatever the group commit window still holds
+        with self._lock:
+            self.block_store.close()
+            self.transaction_log.close()
+
+
+    def verify_chain(self, full=False):
+        with self._lock:
+            contradicted = self.contradicted_checkpoint()
+            if contradicted is not None:
+                print('Block {} does not match its checkpoint'.format(contradicted))
+                return False
+            start = self.verified_height + 1
+            # if the verified tip is gone or changed the chain was replaced, so check all of it
+            if (full or self.verified_tip_hash is None or self.verified_height >= len(self.chain)
+                    or hash_block(self.chain[self.verified_height]) != self.verified_tip_hash):
+                start = 1
+
+            # public keys revealed anywhere in the chain, each block only uses those revealed before it
+            keys = self.balances.keys
+            if start == 1 and self.verify_workers > 1:
+                try:
+                    invalid = parallel_first_invalid_block(self.chain, self.retarget_window, self.block_interval,
+                                                           self.verify_workers, check_signatures=True, keys=keys)
+                except (OSError, ImportError):
+                    invalid = Verification.first_invalid_block(self.chain, self.retarget_window, self.block_interval,
+                                                               check_signatures=True, keys=keys)
+            else:
+                # few blocks but possibly large ones, so spread their signatures over the workers instead
+                invalid = Verification.first_invalid_block(self.chain, self.retarget_window, self.block_interval, start,
+                                                           check_signatures=True, signature_workers=self.verify_workers,
+                                                           keys=keys)
+            if invalid is not None:
+                print('Block {} is invalid'.format(invalid))
+                return False
+            if self.verified_height != len(self.chain) - 1:
+                self.verified_height = len(self.chain) - 1
+                self.verified_tip_hash = hash_block(self.chain[-1])
+                self.save_verified_state()
+
+            return True
+
+
+    def next_target(self):
+        return target_for_height(self.chain, len(self.chain), self.retarget_window, self.block_interval)
+
+
+    def proof_of_work(self, block):
+        if self.mining_workers > 1:
+            try:
+                return parallel_proof_of_work(block, self.mining_workers)
+            except (OSError, ImportError):
+                # no usable multiprocessing on this platform, fall back to the serial loop
+                pass
+
+        midstate = Verification.header_midstate(block)
         proof = 0
 
-        while not Verification.valid_proof(self.open_transactions, last_hash, proof):
+        while not Verification.valid_proof_from_midstate(midstate, proof, block.target):
             proof += 1
         return proof
 
 
-    def get_balance(self):
-        user = self.hosting_node
+    def get_balance(self, address=None, height=None):
+        # constant time, the ledger index is kept up to date as transactions and blocks come in
+        if address is None:
+            address = self.hosting_node
+        # as of the block at height, confirmed funds only
+        if height is not None:
+            return self.ledger.balance_at(address, height)
+
+        return self.balances.balance(address)
+
+
+    def get_transaction_history(self, address=None, page=0, page_size=HISTORY_PAGE_SIZE):
+        # one page of the confirmed transactions an address sent or received, oldest first,
+        # as (block index, position in the block, transaction) looked up through the ledger index
+        if address is None:
+            address = self.hosting_node
+        with self._lock:
+            entries = self.ledger.history_entries(address, page * page_size, page_size)
+
+            return [(index, position, self.chain[index].transactions[position]) for (index, position) in entries]
+
+
+    def get_transaction_history_size(self, address=None):
+        if address is None:
+            address = self.hosting_node
 
-        tx_sender = [[tx.amount for tx in block.transactions
-                      if tx.sender == user] for block in self.chain]
-        open_tx_sender = [tx.amount
-                          for tx in self.open_transactions if tx.sender == user]
-        tx_sender.append(open_tx_sender)
+        return self.ledger.history_size(address)
 
-        amount_sent = reduce(lambda tx_sum, tx_amt: tx_sum + sum(tx_amt)
-                             if len(tx_amt) > 0 else tx_sum + 0, tx_sender, 0)
 
-        tx_recipient = [[tx.amount for tx in block.transactions
-                         if tx.recipient == user] for block in self.chain]
+    def confirmed_balances(self):
+        # balance of every account that appears in the chain, by interned id, see ledger_index.account_id
+        # owned by the ledger index so don't modify it
+        return self.balances.confirmed
 
-        amount_received = reduce(lambda tx_sum, tx_amt: tx_sum + sum(tx_amt)
-                                 if len(tx_amt) > 0 else tx_sum + 0, tx_recipient, 0)
 
-        return amount_received - amount_sent
+    def get_block(self, height):
+        # decoded from the block store on demand, one index lookup and one record
+        with self._lock:
+            if height == 0:
+                return self.chain[0]
+
+            return self.block_store.read(height)
 
 
     def get_last_blockchain_value(self):
@@ -106,35 +372,85 @@ class Blockchain:
         return self.chain[-1]
 
 
-    def add_transaction(self, recipient, sender, amount):
+    def add_transaction(self, recipient, sender, amount, signature=None, public_key=None):
         # transaction = {
         #     'sender': sender,
         #     'recipient': recipient,
         #     'amount': amount
         # }
+        transaction = Transaction(sender, recipient, amount, signature, public_key)
+
+        return self.add_transactions([transaction])[0]
 
+
+    def add_transactions(self, transactions):
         # ensure node id was set
         if self.hosting_node == None:
-            return False
-        transaction = Transaction(sender, recipient, amount)
+            return [False] * len(transactions)
+
+        # signatures are checked as one batch up front, balances one by one in order
+        signing_keys = self.signing_keys(transactions)
+        signatures_valid = verify_signatures(transactions, self.verify_workers, keys=signing_keys)
+        admitted = []
+        with self._lock:
+            for transaction, public_key, signature_valid in zip(transactions, signing_keys, signatures_valid):
+                # the sender signed it, so it is the sender's balance that has to cover it
+                if signature_valid and Verification.verify_transaction(
+                        transaction, lambda: self.get_balance(transaction.sender)):
+                    # a key the chain or pool already revealed is left out, a key only found in this batch kept
+                    transaction = self._reveal_once(transaction, public_key, set())
+                    self.open_transactions.append(transaction)
+                    self.transaction_log.append(transaction, wait=False)
+                    self.template.add(transaction)
+                    # a ledger that wasn't built yet will pick it up from open_transactions
+                    if self._ledger is not None:
+                        self._ledger.add_pending(transaction)
+                    if self._balances is not None:
+                        self._balances.add_pending(transaction)
+                    admitted.append(True)
+                else:
+                    admitted.append(False)
+            if any(admitted):
+                self.revision += 1
+        # outside the lock, so concurrent submitters join the same group commit
+        if any(admitted):
+            self.transaction_log.sync()
+
+        return admitted
 
-        if Verification.verify_transaction(transaction, self.get_balance):
-            self.open_transactions.append(transaction)
-            self.save_data()
 
-            return True
+    def mine_block(self):
+        with self._lock:
+            block = self.candidate_block()
+            # generate proof of work
+            return self._append_block(block.with_proof(self.proof_of_work(block))) is not None
 
-        return False
 
+    def start_mining(self, on_progress=None, on_block=None):
+        return MiningJob(self, on_progress=on_progress, on_block=on_block).start()
 
-    def mine_block(self):
+
+    def mining_snapshot(self):
+        with self._lock:
+            return self.revision, self.candidate_block()
+
+
+    def commit_proof(self, block, proof, revision):
+        # a proof only holds for the tip and open transactions it was searched against
+        with self._lock:
+            if revision != self.revision:
+                return None
+
+            return self._append_block(block.with_proof(proof))
+
+
+    def candidate_block(self):
+        # the next block with everything but its proof, which is what mining searches for
         last_block = self.chain[-1]
 
         # include previous blocks hash
         hashed_block = hash_block(last_block)
 
-        # generate proof of work
-        proof = self.proof_of_work()
         # reward_transaction = {
         #     'sender': 'MINING',
         #     'recipient': owner,
@@ -146,13 +462,30 @@ class Blockchain:
         copied_transactions = self.open_transactions[:]
         copied_transactions.append(reward_transaction)
 
-        block = Block(len(self.chain), hashed_block,
-                      copied_transactions, proof)
+        # the template already hashed the open transactions, only the reward is new
+        return Block(len(self.chain), hashed_block, copied_transactions, 0,
+                     target=self.next_target(), merkle_root=self.template.merkle_root(reward_transaction))
+
 
+    def _append_block(self, block):
+        # a block that isn't stored is dropped, the next one would build on a block a restart doesn't have
+        # chain, ledger and open transactions stay as they were, so the pool is mined again
+        if not self.block_store.append(block):
+            return None
         self.chain.append(block)
+        # a ledger that wasn't built yet will pick the block up from the chain
+        if self._ledger is not None:
+            self._ledger.apply_block(block)
+            self._ledger.clear_pending()
+        if self._balances is not None:
+            self._balances.apply_block(block)
+            self._balances.clear_pending()
+            self.save_balances(self._balances)
         # clear now processed transactions
         self.open_transactions = []
-        # always save after mining new block
-        self.save_data()
+        self.template = BlockTemplate()
+        self.revision += 1
+        # only now that the block is stored, a crash in between leaves a log the next load discards
+        self.transaction_log.reset(block.index)
 
-        return True
+        return block
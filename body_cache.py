@@ -0,0 +1,39 @@
+import threading
+from collections import OrderedDict
+
+# transactions a lazily loaded chain keeps decoded at once, the least recently used blocks are dropped first
+BODY_BUDGET = 100000
+
+
+class BodyCache:
+
+
+    def __init__(self, block_store, budget=BODY_BUDGET):
+        self.block_store = block_store
+        self.budget      = budget
+        # transactions by block height, least recently used first
+        self._bodies     = OrderedDict()
+        self._size       = 0
+        self._lock       = threading.Lock()
+
+
+    def __len__(self):
+        return self._size
+
+
+    def get(self, height):
+        with self._lock:
+            transactions = self._bodies.get(height)
+            if transactions is not None:
+                self._bodies.move_to_end(height)
+                return transactions
+
+            transactions = self.block_store.read(height).transactions
+            self._bodies[height] = transactions
+            self._size += len(transactions)
+            # the block just read stays even if it alone is over budget
+            while self._size > self.budget and len(self._bodies) > 1:
+                _, dropped = self._bodies.popitem(last=False)
+                self._size -= len(dropped)
+
+            return transactions
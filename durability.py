@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+
+# how appended records reach the disk, from safest to fastest
+# every append is fsynced before it returns
+SYNC_ALWAYS = 'always'
+# writers arriving within window_ms of each other, or group_size records, share one fsync
+# that each of them waits for
+SYNC_GROUP = 'group'
+# appends are handed to the OS every window_ms or group_size records, never fsynced
+SYNC_INTERVAL = 'interval'
+
+GROUP_WINDOW_MS = 10
+GROUP_SIZE = 100
+
+
+class Durability:
+
+
+    def __init__(self, mode=SYNC_GROUP, window_ms=GROUP_WINDOW_MS, group_size=GROUP_SIZE):
+        if mode not in (SYNC_ALWAYS, SYNC_GROUP, SYNC_INTERVAL):
+            raise ValueError('unknown durability mode {}'.format(mode))
+        self.mode       = mode
+        self.window_ms  = window_ms
+        self.group_size = group_size
+
+
+    def syncs(self):
+        return self.mode != SYNC_INTERVAL
+
+
+def _sync_directory(path):
+    # a rename is only durable once the directory entry is, not every platform can open one
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data, durability=None):
+    # written aside and renamed over path, so a crash leaves either the old or the new contents
+    temp_path = path + '.tmp'
+    with open(temp_path, mode='wb') as f:
+        f.write(data)
+        f.flush()
+        if durability is None or durability.syncs():
+            os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    if durability is None or durability.syncs():
+        _sync_directory(path)
+
+
+class DurableLog:
+
+
+    def __init__(self, path, durability=None):
+        self.path       = path
+        self.durability = durability if durability is not None else Durability()
+        self._file      = None
+        # records written so far and how many of them are committed, see sync
+        self._written   = 0
+        self._committed = 0
+        # whether a writer is gathering a group to commit, and the timer of interval mode
+        self._leading   = False
+        self._timer     = None
+        self._lock      = threading.Condition()
+
+
+    def append(self, data, wait=True):
+        # returns the record's number for sync, in group mode waits until the record is committed
+        # unless wait is False, callers writing several records sync once after the last
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, mode='ab')
+            self._file.write(data)
+            self._written += 1
+            sequence = self._written
+
+            if (self.durability.mode == SYNC_ALWAYS
+                    or self._written - self._committed >= self.durability.group_size):
+                self._commit()
+            elif self.durability.mode == SYNC_INTERVAL and self._timer is None:
+                # the first record starts the interval, later ones ride along
+                self._timer = threading.Timer(self.durability.window_ms / 1000, self.commit)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if wait:
+            self.sync(sequence)
+
+        return sequence
+
+
+    def sync(self, sequence=None):
+        # waits until record number sequence, by default every record so far, is committed
+        # writers waiting at the same time share one commit: the first one waits up to window_ms
+        # for others to join and then commits for all of them, the others wait for that
+        # interval mode never waits, its records are committed by the timer
+        if self.durability.mode == SYNC_INTERVAL:
+            return
+        with self._lock:
+            sequence = self._written if sequence is None else sequence
+            while self._committed < sequence:
+                if self._leading:
+                    self._lock.wait()
+                    continue
+                self._leading = True
+                deadline = time.monotonic() + self.durability.window_ms / 1000
+                while self._committed < sequence and self._written - self._committed < self.durability.group_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._lock.wait(remaining)
+                self._commit()
+                self._leading = False
+                self._lock.notify_all()
+
+
+    def commit(self):
+        with self._lock:
+            self._commit()
+
+
+    def _commit(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is None or self._committed == self._written:
+            return
+        self._file.flush()
+        if self.durability.syncs():
+            os.fsync(self._file.fileno())
+        self._committed = self._written
+        self._lock.notify_all()
+
+
+    def replace(self, data):
+        # swap the whole log for data, any uncommitted records go with the old one
+        with self._lock:
+            self._close()
+            atomic_write(self.path, data, self.durability)
+
+
+    def truncate(self, size):
+        with self._lock:
+            self._close()
+            with open(self.path, mode='r+b') as f:
+                f.truncate(size)
+
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._close()
+
+
+    def _close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        # whatever was still uncommitted is gone, nobody waits for it any more
+        self._committed = self._written
+        self._lock.notify_all()
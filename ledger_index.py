@@ -0,0 +1,193 @@
+from address_table import ADDRESSES
+from wallet        import Wallet, ADDRESS_LENGTH
+
+# blocks between two copies of all confirmed balances, more snapshots cost memory
+# but answer get_balance at a height with fewer block deltas
+SNAPSHOT_INTERVAL = 1000
+
+# address id -> id of the account it belongs to, see account_id
+_accounts = {}
+
+
+def account_id(address_id):
+
+    # transactions from before short addresses name a full hex public key instead,
+    # their funds belong to the address that key hashes to
+    account = _accounts.get(address_id)
+    if account is None:
+        account = address_id
+        address = ADDRESSES.lookup(address_id)
+        if len(address) > ADDRESS_LENGTH:
+            try:
+                account = ADDRESSES.intern(Wallet.address_from_key(address))
+            except ValueError:
+                # not hex, so not a key either
+                pass
+        _accounts[address_id] = account
+
+    return account
+
+
+def _find_account(address):
+
+    # None for an address no transaction mentions
+    address_id = ADDRESSES.find(address)
+
+    return None if address_id is None else account_id(address_id)
+
+
+def reveal_keys(keys, block):
+
+    # a sender's first transaction with a key that hashes to its address reveals that key,
+    # recorded by address as (block index, position, key), the sender's later transactions leave it out
+    for position, tx in enumerate(block.transactions):
+        if tx.public_key_id is not None and tx.sender not in keys and Wallet.key_matches(tx.public_key, tx.sender):
+            keys[tx.sender] = (block.index, position, tx.public_key)
+
+
+def revealed_key(keys, transaction, index, position):
+
+    # the key to check the transaction at position of block index against, None if it is the one it carries
+    if transaction.public_key_id is not None:
+        return None
+    revealed = keys.get(transaction.sender)
+    if revealed is not None and revealed[:2] < (index, position):
+        return revealed[2]
+
+    return None
+
+
+class Balances:
+    # confirmed and pending balance per account, without the history and snapshots of LedgerIndex
+    # it holds an entry per account rather than per transaction, so lazy loading can afford it
+
+
+    def __init__(self, confirmed=None, open_transactions=(), keys=None):
+        # keyed like LedgerIndex, by the interned address id of the account
+        self.confirmed    = confirmed if confirmed is not None else {}
+        self.pending      = {}
+        # public keys revealed in the blocks applied so far, see reveal_keys, and in open transactions
+        self.keys         = keys if keys is not None else {}
+        self.pending_keys = {}
+
+        for tx in open_transactions:
+            self.add_pending(tx)
+
+
+    @staticmethod
+    def from_dict(balances, open_transactions=()):
+        confirmed = {ADDRESSES.intern(address): amount for address, amount in balances['confirmed'].items()}
+        keys = {address: tuple(revealed) for address, revealed in balances['keys'].items()}
+
+        return Balances(confirmed, open_transactions, keys)
+
+
+    def to_dict(self):
+        # by address, the ids only mean something in this process
+        return {'confirmed': {ADDRESSES.lookup(account): amount for account, amount in self.confirmed.items()},
+                'keys': self.keys}
+
+
+    def apply_block(self, block):
+        for tx in block.transactions:
+            sender, recipient = account_id(tx.sender_id), account_id(tx.recipient_id)
+            self.confirmed[sender] = self.confirmed.get(sender, 0) - tx.amount
+            self.confirmed[recipient] = self.confirmed.get(recipient, 0) + tx.amount
+        reveal_keys(self.keys, block)
+
+
+    def add_pending(self, transaction):
+        sender = account_id(transaction.sender_id)
+        self.pending[sender] = self.pending.get(sender, 0) + transaction.amount
+        if (transaction.public_key_id is not None and self.known_key(transaction.sender) is None
+                and Wallet.key_matches(transaction.public_key, transaction.sender)):
+            self.pending_keys[transaction.sender] = transaction.public_key
+
+
+    def clear_pending(self):
+        self.pending = {}
+        self.pending_keys = {}
+
+
+    def known_key(self, address):
+        # the key an address revealed in a block or an open transaction, None if it didn't yet
+        revealed = self.keys.get(address)
+
+        return revealed[2] if revealed is not None else self.pending_keys.get(address)
+
+
+    def balance(self, address):
+        # what an address can still spend: funds received in blocks less everything sent, open or not
+        address_id = _find_account(address)
+
+        return self.confirmed.get(address_id, 0) - self.pending.get(address_id, 0)
+
+
+class LedgerIndex(Balances):
+
+
+    def __init__(self, chain=(), open_transactions=(), snapshot_interval=SNAPSHOT_INTERVAL):
+        # all maps are keyed by the interned address id of the account, see account_id
+        # balance of every address from the blocks applied so far, amounts committed in open transactions
+        # and revealed keys, see Balances
+        super().__init__()
+        # how every block changed the balances it touched, by block index
+        self.deltas    = []
+        # copies of confirmed after every snapshot_interval-th block, by block index
+        self.snapshots = {}
+        self.snapshot_interval = snapshot_interval
+        # (block index, position in the block) of every transaction an address sent or received
+        self.history   = {}
+
+        for block in chain:
+            self.apply_block(block)
+        for tx in open_transactions:
+            self.add_pending(tx)
+
+
+    def apply_block(self, block):
+        delta = {}
+        for position, tx in enumerate(block.transactions):
+            sender, recipient = account_id(tx.sender_id), account_id(tx.recipient_id)
+            self.confirmed[sender] = self.confirmed.get(sender, 0) - tx.amount
+            self.confirmed[recipient] = self.confirmed.get(recipient, 0) + tx.amount
+            delta[sender] = delta.get(sender, 0) - tx.amount
+            delta[recipient] = delta.get(recipient, 0) + tx.amount
+
+            self.history.setdefault(sender, []).append((block.index, position))
+            if recipient != sender:
+                self.history.setdefault(recipient, []).append((block.index, position))
+
+        self.deltas.append(delta)
+        if block.index % self.snapshot_interval == 0:
+            self.snapshots[block.index] = dict(self.confirmed)
+        reveal_keys(self.keys, block)
+
+
+    def history_entries(self, address, offset=0, limit=None):
+        # oldest first, slicing keeps a page independent of how long the history is
+        entries = self.history.get(_find_account(address), [])
+        end = len(entries) if limit is None else offset + limit
+
+        return entries[offset:end]
+
+
+    def history_size(self, address):
+        return len(self.history.get(_find_account(address), []))
+
+
+    def balance_at(self, address, height):
+        # confirmed balance once the block at height was applied, from the nearest
+        # snapshot below it plus fewer than snapshot_interval block deltas
+        if height < 0:
+            raise IndexError('block height out of range')
+        address_id = _find_account(address)
+        if height >= len(self.deltas) - 1:
+            return self.confirmed.get(address_id, 0)
+
+        base = height - height % self.snapshot_interval
+        balance = self.snapshots[base].get(address_id, 0)
+        for delta in self.deltas[base + 1:height + 1]:
+            balance += delta.get(address_id, 0)
+
+        return balance
\ No newline at end of file
@@ -0,0 +1,151 @@
+import threading
+import time
+
+from utility.mining_util import ProofSearch
+from verification        import Verification
+
+# proofs checked per worker between looks at the cancel token and the chain state
+BATCH_SIZE = 5000
+# seconds between two progress callbacks
+PROGRESS_INTERVAL = 1.0
+
+
+class MiningJob:
+
+
+    def __init__(self, blockchain, on_progress=None, on_block=None,
+                 batch_size=BATCH_SIZE, progress_interval=PROGRESS_INTERVAL):
+        self.blockchain        = blockchain
+        # on_progress(attempts, hashrate, elapsed), on_block(block, attempts), both called on the job's thread
+        self.on_progress       = on_progress
+        self.on_block          = on_block
+        self.batch_size        = batch_size
+        self.progress_interval = progress_interval
+
+        # cancel token, set it to stop the search at the next batch boundary
+        self.cancelled = threading.Event()
+        self.attempts  = 0
+        self.restarts  = 0
+        self.block     = None
+        self.started   = None
+        self.finished  = None
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+
+    def start(self):
+        self.started = time.time()
+        self._thread.start()
+
+        return self
+
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+        return self.block
+
+
+    def is_running(self):
+        return self._thread.is_alive()
+
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        end = self.finished if self.finished is not None else time.time()
+
+        return end - self.started
+
+
+    def hashrate(self):
+        elapsed = self.elapsed()
+        if elapsed <= 0:
+            return 0.0
+
+        return self.attempts / elapsed
+
+
+    def _report(self):
+        if self.on_progress is not None:
+            self.on_progress(self.attempts, self.hashrate(), self.elapsed())
+
+
+    def _search(self, revision, search_batch, batch_size):
+        # returns a proof, or None when cancelled or the chain state moved on
+        proof = 0
+        last_report = time.time()
+
+        while not self.cancelled.is_set():
+            found = search_batch(proof, proof + batch_size)
+            if found is not None:
+                self.attempts += found - proof + 1
+                return found
+            self.attempts += batch_size
+            proof += batch_size
+
+            if time.time() - last_report >= self.progress_interval:
+                self._report()
+                last_report = time.time()
+            if self.blockchain.revision != revision:
+                return None
+
+        return None
+
+
+    def _search_block(self, revision, block, proof_search):
+        # with a proof search, a batch is spread over its workers, one batch_size chunk each
+        if proof_search is not None:
+            return self._search(revision, lambda start, stop: proof_search.search(block, start, stop),
+                                self.batch_size * proof_search.workers)
+
+        midstate = Verification.header_midstate(block)
+
+        def search_batch(start, stop):
+            for candidate in range(start, stop):
+                if Verification.valid_proof_from_midstate(midstate, candidate, block.target):
+                    return candidate
+            return None
+
+        return self._search(revision, search_batch, self.batch_size)
+
+
+    def _open_search(self):
+        # one pool of the blockchain's mining workers for the whole job, a restart only sends a new header
+        workers = self.blockchain.mining_workers
+        if workers > 1:
+            try:
+                return ProofSearch(workers, self.batch_size)
+            except (OSError, ImportError):
+                # no usable multiprocessing on this platform, fall back to the serial loop
+                pass
+
+        return None
+
+
+    def _run(self):
+        proof_search = self._open_search()
+        try:
+            while not self.cancelled.is_set():
+                revision, block = self.blockchain.mining_snapshot()
+                proof = self._search_block(revision, block, proof_search)
+                if proof is not None:
+                    # None here means a transaction or block arrived after the proof was found,
+                    # or the block couldn't be stored, either way the search starts over
+                    self.block = self.blockchain.commit_proof(block, proof, revision)
+                    if self.block is not None:
+                        break
+                if not self.cancelled.is_set():
+                    self.restarts += 1
+        finally:
+            if proof_search is not None:
+                proof_search.close()
+            self.finished = time.time()
+            self._report()
+
+        if self.block is not None and self.on_block is not None:
+            self.on_block(self.block, self.attempts)
@@ -1,3 +1,5 @@
+import argparse
+
 from blockchain   import Blockchain
 from verification import Verification
 from wallet       import Wallet
@@ -5,12 +7,15 @@ from wallet       import Wallet
 class Node:
 
 
-    def __init__(self):
+    def __init__(self, lazy=False):
 
         self.wallet     = Wallet()
         self.wallet.create_keys()
 
-        self.blockchain = Blockchain(self.wallet.public_key)
+        # keep only block headers in memory, see Blockchain
+        self.lazy       = lazy
+        self.blockchain = Blockchain(self.wallet.address, lazy=lazy)
+        self.mining_job = None
 
 
     def get_transaction_value(self):
@@ -30,19 +35,71 @@ class Node:
             print('#' * 40)
 
 
+    def print_block(self):
+
+        try:
+            print(self.blockchain.get_block(int(input('Block height: '))))
+        except (ValueError, IndexError):
+            print('No block at that height!')
+
+
+    def start_mining(self):
+
+        if self.mining_job is not None and self.mining_job.is_running():
+            print('Already mining, check its status with option 8')
+            return
+        self.mining_job = self.blockchain.start_mining(on_block=self.print_mined_block)
+        print('Mining started in the background')
+
+
+    def stop_mining(self):
+
+        if self.mining_job is not None and self.mining_job.is_running():
+            self.mining_job.cancel()
+            self.mining_job.join()
+            print('Mining stopped')
+
+
+    def print_mined_block(self, block, attempts):
+
+        # runs on the job's thread, possibly before start_mining stored the job
+        print()
+        print('Mined block {} after {} attempts'.format(block.index, attempts))
+
+
+    def print_mining_status(self):
+
+        if self.mining_job is None:
+            print('No block is being mined')
+            return
+        job = self.mining_job
+        state = 'running' if job.is_running() else 'finished'
+        print('Mining {}: {} attempts in {:.1f}s ({:.0f} H/s), {} restarts'.format(
+            state, job.attempts, job.elapsed(), job.hashrate(), job.restarts))
+
+
     def listen(self):
         waiting_for_input = True
 
+        # only blocks above the last verified height or checkpoint are checked here
+        if not self.blockchain.verify_chain():
+            print('Invalid blockchain!')
+            return
+
 
         while waiting_for_input:
             print('Please choose')
             print('1: Add a new transaction value')
             print('2: Mine a new block')
             print('3: Output the blockchain blocks')
+            print('b: Output a block by height')
             print('4: Check transaction validity')
             print('5: Create wallet')
             print('6: Load wallet')
             print('7: Save keys')
+            print('8: Show mining status')
+            print('9: Stop mining')
+            print('v: Verify the whole chain')
             print('q: Quit')
 
             user_choice = input('Selection: ')
@@ -50,44 +107,68 @@ class Node:
             if user_choice == '1':
                 tx_data = self.get_transaction_value()
                 recipient, amount = tx_data
-                if self.blockchain.add_transaction(recipient, self.id, amount=amount):
+                sender = self.wallet.address
+                signature = self.wallet.sign_transaction(sender, recipient, amount)
+                if self.blockchain.add_transaction(recipient, sender, amount, signature, self.wallet.public_key):
                     print('Transaction Added')
                 else:
                     print('Transaction Failed')
                 print(self.blockchain.open_transactions)
             elif user_choice == '2':
-                self.blockchain.mine_block()
+                self.start_mining()
             elif user_choice == '3':
                 self.print_blockchain_elements()
+            elif user_choice == 'b':
+                self.print_block()
             elif user_choice == '4':
-                if Verification.verify_transactions(self.blockchain.open_transactions, self.blockchain.get_balance):
+                if Verification.verify_transactions(self.blockchain.open_transactions, self.blockchain.confirmed_balances()):
                     print('All transactions valid')
                 else:
                     print('Invalid transaction found!')
                     print('Exiting!')
                     break
             elif user_choice == '5':
+                self.stop_mining()
+                self.blockchain.close()
                 self.wallet.create_keys()
-                self.blockchain = Blockchain(self.wallet.public_key)
+                self.blockchain = Blockchain(self.wallet.address, lazy=self.lazy)
             elif user_choice == '6':
+                self.stop_mining()
+                self.blockchain.close()
                 self.wallet.load_keys()
-                self.blockchain = Blockchain(self.wallet.public_key)
+                self.blockchain = Blockchain(self.wallet.address, lazy=self.lazy)
             elif user_choice == '7':
                 self.wallet.save_keys()
+            elif user_choice == '8':
+                self.print_mining_status()
+            elif user_choice == '9':
+                self.stop_mining()
+            elif user_choice == 'v':
+                if self.blockchain.verify_chain(full=True):
+                    print('Blockchain is valid')
             elif user_choice == 'q':
+                self.stop_mining()
+                self.blockchain.close()
                 waiting_for_input = False
             else:
                 print('Input was invalid, please pick a value from the list!')
-            if not Verification.verify_chain(self.blockchain.chain):
+            # only blocks added since the last check are verified here, 'v' checks everything
+            if not self.blockchain.verify_chain():
                 self.print_blockchain_elements()
                 print('Invalid blockchain!')
+                self.stop_mining()
+                self.blockchain.close()
                 break
             print()
-            print('Balance of {}: {:6.4f}'.format(self.wallet.public_key, self.blockchain.get_balance()))
+            print('Balance of {}: {:6.4f}'.format(self.wallet.address, self.blockchain.get_balance()))
         else:
             print('User left!')
 
         print('Done!')
 
-node = Node()
+parser = argparse.ArgumentParser()
+parser.add_argument('--lazy', action='store_true', help='load block headers only, transactions are read on demand')
+args = parser.parse_args()
+
+node = Node(lazy=args.lazy)
 node.listen()
\ No newline at end of file
@@ -0,0 +1,134 @@
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from block              import Block
+from block_store        import BlockStore
+from transaction        import Transaction
+from utility.codec_util import COLUMN_LAYOUT
+
+
+def build_blocks(length):
+
+    return [Block(index, '00' * 32, [Transaction('ab' * 20, 'cd' * 20, 2.5, 'ef' * 128),
+                                     Transaction('MINING', 'ab' * 20, 10)], index,
+                  '2020-01-01 00:00:{:02d}.000000'.format(index), 2 ** 240, 'cd' * 32)
+            for index in range(1, length + 1)]
+
+
+class BlockStoreRecoveryTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'blocks.log')
+        self.index_path = os.path.join(self.directory, 'blocks.idx')
+        self.blocks = build_blocks(3)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def write(self, binary):
+        store = BlockStore(self.path, self.index_path, binary=binary)
+        for block in self.blocks:
+            store.append(block)
+        store.close()
+        # binary records are written in the layout a store of mined blocks uses
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(1)[0] == COLUMN_LAYOUT, binary)
+
+
+    def reopen(self):
+        store = BlockStore(self.path, self.index_path)
+        self.addCleanup(store.close)
+        store.recover()
+
+        return store
+
+
+    def test_torn_last_record_is_cut_off(self):
+        # the last index entry points past the end of the log and the log ends in part of a record
+        for binary in (False, True):
+            with self.subTest(binary=binary):
+                self.write(binary)
+                size = os.path.getsize(self.path)
+                with open(self.path, 'r+b') as f:
+                    f.truncate(size - 10)
+
+                store = self.reopen()
+
+                self.assertEqual(len(store), 2)
+                self.assertEqual(os.path.getsize(self.index_path), 2 * 12)
+                self.assertEqual([block.to_json() for block in store.load()],
+                                 [block.to_json() for block in self.blocks[:2]])
+                store.append(self.blocks[2])
+                self.assertEqual(store.read(3).to_json(), self.blocks[2].to_json())
+                store.close()
+                os.remove(self.path)
+                os.remove(self.index_path)
+
+
+    def test_unindexed_record_is_indexed(self):
+        # a crash between writing a record and its index entry
+        for binary in (False, True):
+            with self.subTest(binary=binary):
+                self.write(binary)
+                with open(self.index_path, 'r+b') as f:
+                    f.truncate(2 * 12)
+
+                store = self.reopen()
+
+                self.assertEqual(len(store), 3)
+                self.assertEqual(store.read(3).to_json(), self.blocks[2].to_json())
+                store.close()
+                os.remove(self.path)
+                os.remove(self.index_path)
+
+
+    def test_index_of_a_removed_log_is_reset(self):
+        self.write(binary=True)
+        os.remove(self.path)
+
+        store = self.reopen()
+        self.assertEqual(len(store), 0)
+        store.append(self.blocks[0])
+        store.close()
+
+        store = self.reopen()
+        self.assertEqual([block.to_json() for block in store.load()], [self.blocks[0].to_json()])
+
+
+    def test_index_of_a_replaced_log_is_rebuilt(self):
+        # an index entry that fits inside the new log but doesn't point at one of its records
+        self.write(binary=True)
+        with open(self.path, 'wb') as f:
+            f.write(b''.join((block.to_json() + '\n').encode() for block in self.blocks[:1]))
+        with open(self.index_path, 'r+b') as f:
+            f.truncate(12)
+
+        store = self.reopen()
+        self.assertEqual([block.to_json() for block in store.load()], [self.blocks[0].to_json()])
+        self.assertEqual(len(store.load_headers()), 1)
+
+
+    def test_entries_pointing_into_records_are_rebuilt(self):
+        # the last entry holds a record, an earlier one doesn't
+        self.write(binary=False)
+        first, second = ((block.to_json() + '\n').encode() for block in self.blocks[:2])
+        with open(self.index_path, 'wb') as f:
+            f.write(struct.pack('<QI', 5, 10) + struct.pack('<QI', len(first), len(second)))
+
+        store = self.reopen()
+        self.assertEqual([block.to_json() for block in store.load()],
+                         [block.to_json() for block in self.blocks])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from block_template    import BlockTemplate
+from transaction       import Transaction
+from utility.hash_util import hash_transaction, merkle_root, serialize_transaction
+
+
+def transfer(n):
+
+    return Transaction('{:040x}'.format(n), '{:040x}'.format(n + 1), n * 0.5, 'ab' * 128)
+
+
+class BlockTemplateTest(unittest.TestCase):
+
+
+    def test_incremental_root_matches_full_root(self):
+        # odd and even sizes on every level, each checked right after its transaction was added
+        reward = Transaction('MINING', 'cd' * 20, 10)
+        template = BlockTemplate()
+        transactions = []
+        for n in range(34):
+            with self.subTest(open_transactions=n):
+                expected = merkle_root([hash_transaction(tx) for tx in transactions + [reward]])
+                self.assertEqual(template.merkle_root(reward), expected)
+            transactions.append(transfer(n))
+            template.add(transactions[-1])
+
+
+    def test_built_from_transactions(self):
+        transactions = [transfer(n) for n in range(5)]
+        template = BlockTemplate(transactions)
+        reward = Transaction('MINING', 'cd' * 20, 10)
+
+        self.assertEqual(len(template), 5)
+        self.assertEqual(template.serialized, [serialize_transaction(tx) for tx in transactions])
+        self.assertEqual(template.size, sum(len(data) for data in template.serialized))
+        self.assertEqual(template.merkle_root(reward),
+                         merkle_root([hash_transaction(tx) for tx in transactions + [reward]]))
+
+
+    def test_leaves_commit_to_signature_and_key(self):
+        transaction = transfer(1)
+        self.assertNotEqual(hash_transaction(transaction),
+                            hash_transaction(Transaction(transaction.sender, transaction.recipient, transaction.amount,
+                                                         'cd' * 128)))
+        self.assertNotEqual(hash_transaction(transaction), hash_transaction(transaction.with_public_key('ef' * 162)))
+        # rewards serialize as before signatures existed, so their roots are unchanged
+        reward = Transaction('MINING', 'cd' * 20, 10)
+        self.assertEqual(serialize_transaction(reward), json.dumps(reward.to_ordered_dict()).encode())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from blockchain import Blockchain
+from wallet     import Wallet
+
+
+class BlockchainTest(unittest.TestCase):
+
+
+    @classmethod
+    def setUpClass(cls):
+        cls.wallet = Wallet()
+        cls.wallet.create_keys()
+
+
+    def setUp(self):
+        # the blockchain keeps its files in the working directory
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        os.chdir(self.directory)
+
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+
+    def open(self, **options):
+        blockchain = Blockchain(self.wallet.address, mining_workers=1, verify_workers=1, **options)
+        self.addCleanup(blockchain.close)
+
+        return blockchain
+
+
+    def send(self, blockchain, recipient, amount):
+        signature = self.wallet.sign_transaction(self.wallet.address, recipient, amount)
+
+        return blockchain.add_transaction(recipient, self.wallet.address, amount, signature, self.wallet.public_key)
+
+
+    def test_block_that_failed_to_store_is_dropped(self):
+        blockchain = self.open()
+        self.assertTrue(blockchain.mine_block())
+        self.assertTrue(self.send(blockchain, 'ab' * 20, 2.5))
+
+        append = blockchain.block_store.log.append
+        def failing_append(data, wait=True):
+            raise OSError('disk full')
+        blockchain.block_store.log.append = failing_append
+        self.assertFalse(blockchain.mine_block())
+        blockchain.block_store.log.append = append
+
+        self.assertEqual(len(blockchain.chain), 2)
+        self.assertEqual(len(blockchain.open_transactions), 1)
+        self.assertEqual(blockchain.get_balance(), 7.5)
+        blockchain.close()
+
+        blockchain = self.open()
+        self.assertEqual(len(blockchain.chain), 2)
+        self.assertEqual(len(blockchain.open_transactions), 1)
+        self.assertTrue(blockchain.mine_block())
+        blockchain.close()
+
+        blockchain = self.open()
+        self.assertEqual(len(blockchain.chain), 3)
+        self.assertTrue(blockchain.verify_chain(full=True))
+        self.assertEqual(blockchain.get_balance(), 17.5)
+
+
+    def test_lazy_balance_does_not_build_the_ledger(self):
+        blockchain = self.open(lazy=True)
+        for _ in range(3):
+            self.assertTrue(blockchain.mine_block())
+        self.assertTrue(self.send(blockchain, 'ab' * 20, 4))
+        self.assertTrue(blockchain.mine_block())
+        blockchain.close()
+
+        for saved in (True, False):
+            if not saved:
+                os.remove('blockchain.balances')
+            blockchain = self.open(lazy=True)
+            self.assertEqual(blockchain.get_balance(), 36)
+            self.assertEqual(blockchain.get_balance('ab' * 20), 4)
+            self.assertIsNone(blockchain._ledger)
+            self.assertEqual(len(blockchain.bodies), 0)
+            blockchain.close()
+
+        blockchain = self.open()
+        self.assertEqual(blockchain.get_balance(), 36)
+
+
+    def test_public_key_is_revealed_once(self):
+        blockchain = self.open()
+        self.assertTrue(blockchain.mine_block())
+        self.assertTrue(self.send(blockchain, 'ab' * 20, 1))
+        self.assertTrue(self.send(blockchain, 'cd' * 20, 2))
+        self.assertEqual([tx.public_key for tx in blockchain.open_transactions], [self.wallet.public_key, None])
+        self.assertTrue(blockchain.mine_block())
+        self.assertTrue(self.send(blockchain, 'ab' * 20, 3))
+        self.assertIsNone(blockchain.open_transactions[0].public_key)
+        blockchain.close()
+
+        blockchain = self.open()
+        self.assertEqual(len(blockchain.open_transactions), 1)
+        self.assertTrue(blockchain.verify_chain(full=True))
+        self.assertTrue(blockchain.mine_block())
+        self.assertTrue(blockchain.verify_chain())
+        self.assertEqual(blockchain.get_balance(), 24)
+
+
+    def test_transaction_without_a_revealed_key_is_rejected(self):
+        blockchain = self.open()
+        self.assertTrue(blockchain.mine_block())
+        signature = self.wallet.sign_transaction(self.wallet.address, 'ab' * 20, 1)
+        self.assertFalse(blockchain.add_transaction('ab' * 20, self.wallet.address, 1, signature))
+
+
+    def test_checkpoints(self):
+        blockchain = self.open()
+        for _ in range(3):
+            self.assertTrue(blockchain.mine_block())
+        checkpoint_hash = blockchain.chain[2].hash
+        self.assertTrue(blockchain.verify_chain())
+        blockchain.close()
+        os.remove('blockchain.verified')
+
+        blockchain = self.open(checkpoints={2: checkpoint_hash, 9: 'ff' * 64})
+        self.assertEqual(blockchain.verified_height, 2)
+        self.assertTrue(blockchain.verify_chain())
+        blockchain.close()
+
+        # even a chain that verified before is rejected once it contradicts a checkpoint
+        blockchain = self.open(checkpoints={2: 'ff' * 64})
+        self.assertEqual(blockchain.verified_height, 0)
+        self.assertFalse(blockchain.verify_chain())
+        self.assertFalse(blockchain.verify_chain(full=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
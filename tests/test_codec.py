@@ -0,0 +1,86 @@
+import math
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from block              import Block
+from transaction        import Transaction
+from utility.codec_util import COLUMN_LAYOUT, TAGGED_LAYOUT, decode_block, encode_block, read_block, read_header
+
+
+def signed(amount, sender='ab' * 20, public_key='cd' * 162):
+
+    return Transaction(sender, 'ef' * 20, amount, '12' * 128, public_key)
+
+
+def block_of(transactions, target=2 ** 240, merkle_root='34' * 64):
+
+    return Block(7, '56' * 64, transactions + [Transaction('MINING', 'ab' * 20, 10)], 1234,
+                 '2020-01-01 12:30:45.123456', target, merkle_root)
+
+
+class CodecTest(unittest.TestCase):
+
+
+    def assertRoundTrip(self, block, layout):
+        data = block.to_bytes()
+        self.assertEqual(data[0], layout)
+        self.assertEqual(Block.from_bytes(data).to_json(), block.to_json())
+        self.assertEqual(Block.from_dict(decode_block(data)).to_json(), block.to_json())
+
+
+    def test_block_round_trips_in_columns(self):
+        self.assertRoundTrip(block_of([signed(2.5), signed(0.1, public_key=None), signed(3), signed(-2 ** 63),
+                                       signed(1, sender='abc'), signed(1, sender='é')]), COLUMN_LAYOUT)
+        self.assertRoundTrip(block_of([]), COLUMN_LAYOUT)
+
+
+    def test_values_the_columns_cannot_hold_are_tagged(self):
+        # floats without an exact fixed point form, integers past 64 bits and amounts that aren't numbers
+        for transactions in ([signed(-0.0)], [signed(1 / 3)], [signed(1e301)], [signed(2 ** 70)], [signed('1')]):
+            with self.subTest(transactions=transactions):
+                self.assertRoundTrip(block_of(transactions), TAGGED_LAYOUT)
+
+
+    def test_legacy_header_fields(self):
+        # blocks from before per block targets and merkle roots
+        self.assertRoundTrip(block_of([signed(1)], target=None, merkle_root=None), COLUMN_LAYOUT)
+
+
+    def test_nan_amount(self):
+        block = Block.from_bytes(encode_block(block_of([signed(float('nan'))])))
+        self.assertTrue(math.isnan(block.transactions[0].amount))
+
+
+    def test_transaction_round_trips(self):
+        for transaction in (signed(2.5), signed(1, public_key=None), Transaction('MINING', 'ab' * 20, 10)):
+            with self.subTest(transaction=transaction):
+                data = transaction.to_bytes()
+                self.assertEqual(data[0], TAGGED_LAYOUT)
+                self.assertEqual(Transaction.from_bytes(data).to_dict(), transaction.to_dict())
+
+
+    def test_records_need_no_delimiter(self):
+        blocks = [block_of([signed(1)]), block_of([signed(1e301)])]
+        data = b''.join(block.to_bytes() for block in blocks)
+
+        offset = 0
+        for block in blocks:
+            header, _ = read_header(data, offset)
+            self.assertEqual(header['transaction_count'], 2)
+            decoded, offset = read_block(data, offset)
+            self.assertEqual(Block.from_dict(decoded).to_json(), block.to_json())
+        self.assertEqual(offset, len(data))
+
+
+    def test_unknown_version_is_rejected(self):
+        with self.assertRaises(ValueError):
+            decode_block(b'\x09' + encode_block(block_of([]))[1:])
+        with self.assertRaises(ValueError):
+            decode_block(b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import durability
+from durability import Durability, DurableLog, SYNC_ALWAYS, SYNC_GROUP, SYNC_INTERVAL, atomic_write
+
+
+class DurableLogTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'log')
+        # counts fsyncs of the log, and lets them through
+        self.fsyncs = 0
+        fsync = os.fsync
+        def counting_fsync(fd):
+            self.fsyncs += 1
+            fsync(fd)
+        patcher = mock.patch.object(durability.os, 'fsync', counting_fsync)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def open(self, mode, window_ms=50, group_size=100):
+        log = DurableLog(self.path, Durability(mode, window_ms, group_size))
+        self.addCleanup(log.close)
+
+        return log
+
+
+    def test_group_writers_wait_for_a_shared_commit(self):
+        log = self.open(SYNC_GROUP)
+        barrier = threading.Barrier(8)
+        committed = []
+        def write(n):
+            barrier.wait()
+            sequence = log.append('{}\n'.format(n).encode())
+            # append only returns once its own record is committed
+            committed.append(log._committed >= sequence)
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(committed, [True] * 8)
+        self.assertLess(self.fsyncs, 8)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(sorted(f.read().split()), sorted(str(n).encode() for n in range(8)))
+
+
+    def test_full_group_commits_without_waiting(self):
+        log = self.open(SYNC_GROUP, window_ms=60000, group_size=3)
+        for n in range(3):
+            log.append(b'x', wait=False)
+        self.assertEqual(self.fsyncs, 1)
+        # nothing left to wait for, sync returns at once
+        log.sync()
+        self.assertEqual(self.fsyncs, 1)
+
+
+    def test_sync_commits_records_appended_without_waiting(self):
+        log = self.open(SYNC_GROUP, window_ms=1)
+        sequence = log.append(b'x', wait=False)
+        self.assertLess(log._committed, sequence)
+        log.sync(sequence)
+        self.assertEqual(log._committed, sequence)
+        self.assertEqual(self.fsyncs, 1)
+
+
+    def test_always_commits_every_record(self):
+        log = self.open(SYNC_ALWAYS)
+        for _ in range(3):
+            log.append(b'x')
+        self.assertEqual(self.fsyncs, 3)
+
+
+    def test_interval_never_syncs(self):
+        log = self.open(SYNC_INTERVAL, window_ms=1)
+        log.append(b'x')
+        log.sync()
+        log.close()
+        self.assertEqual(self.fsyncs, 0)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'x')
+
+
+    def test_replace_and_truncate(self):
+        log = self.open(SYNC_GROUP)
+        log.append(b'abc', wait=False)
+        log.replace(b'header\n')
+        log.append(b'record\n')
+        log.truncate(len(b'header\n'))
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'header\n')
+
+
+    def test_atomic_write_leaves_no_temp_file(self):
+        atomic_write(self.path, b'data')
+        self.assertEqual(os.listdir(self.directory), ['log'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from block        import Block
+from ledger_index import LedgerIndex
+from transaction  import Transaction
+
+ALICE = 'a1' * 20
+BOB   = 'b2' * 20
+
+
+def build_chain(length):
+
+    # every block rewards alice, every other one has her pay bob as much as the block's index
+    chain = [Block(0, '', [], 0, 0)]
+    for index in range(1, length):
+        transactions = [Transaction(ALICE, BOB, index, 'ab' * 128)] if index % 2 == 0 else []
+        transactions.append(Transaction('MINING', ALICE, 10))
+        chain.append(Block(index, '00', transactions, 0, '2020-01-01 00:00:00.000000'))
+
+    return chain
+
+
+class LedgerIndexTest(unittest.TestCase):
+
+
+    def test_balance_at_across_snapshots(self):
+        chain = build_chain(17)
+        ledger = LedgerIndex(chain, snapshot_interval=4)
+
+        for height in range(len(chain) + 2):
+            with self.subTest(height=height):
+                blocks = chain[:height + 1]
+                alice = sum(tx.amount if tx.recipient == ALICE else -tx.amount
+                            for block in blocks for tx in block.transactions if ALICE in (tx.sender, tx.recipient))
+                bob = sum(tx.amount for block in blocks for tx in block.transactions if tx.recipient == BOB)
+                self.assertEqual(ledger.balance_at(ALICE, height), alice)
+                self.assertEqual(ledger.balance_at(BOB, height), bob)
+        self.assertEqual(ledger.balance_at('c3' * 20, 5), 0)
+        with self.assertRaises(IndexError):
+            ledger.balance_at(ALICE, -1)
+
+
+    def test_balance_at_is_confirmed_only(self):
+        chain = build_chain(5)
+        ledger = LedgerIndex(chain, [Transaction(ALICE, BOB, 7, 'ab' * 128)], snapshot_interval=2)
+
+        # open transactions count against what alice can spend, not against her balance in a block
+        self.assertEqual(ledger.balance_at(ALICE, 4), 40 - 2 - 4)
+        self.assertEqual(ledger.balance(ALICE), 40 - 2 - 4 - 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
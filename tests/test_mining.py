@@ -0,0 +1,98 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import utility.mining_util as mining_util
+from block                   import Block
+from mining_job              import MiningJob
+from utility.difficulty_util import INITIAL_TARGET
+from utility.mining_util     import ProofSearch
+from verification            import Verification
+
+
+def candidate(index):
+
+    return Block(index, '{:0128x}'.format(index), [], 0, '2020-01-01 00:00:00.000000', INITIAL_TARGET, 'ab' * 64)
+
+
+def serial_proof(block):
+
+    midstate = Verification.header_midstate(block)
+    proof = 0
+    while not Verification.valid_proof_from_midstate(midstate, proof, block.target):
+        proof += 1
+
+    return proof
+
+
+class StaleBlockchain:
+    # hands out a new candidate every time and turns down the first proofs, as if transactions kept arriving
+
+
+    def __init__(self, rejections):
+        self.mining_workers = 2
+        self.revision       = 0
+        self.rejections     = rejections
+        self.proofs         = []
+
+
+    def mining_snapshot(self):
+        self.revision += 1
+
+        return self.revision, candidate(self.revision)
+
+
+    def commit_proof(self, block, proof, revision):
+        self.proofs.append((block, proof))
+        if len(self.proofs) <= self.rejections:
+            return None
+
+        return block.with_proof(proof)
+
+
+class ProofSearchTest(unittest.TestCase):
+
+
+    def test_one_pool_finds_the_serial_proof_of_every_block(self):
+        with ProofSearch(2, chunk_size=64) as search:
+            for index in range(1, 5):
+                with self.subTest(index=index):
+                    block = candidate(index)
+                    proof = None
+                    start = 0
+                    while proof is None:
+                        proof = search.search(block, start, start + 512)
+                        start += 512
+                    self.assertEqual(proof, serial_proof(block))
+
+
+    def test_job_keeps_its_pool_across_restarts(self):
+        blockchain = StaleBlockchain(rejections=3)
+        pool = mining_util.mp.Pool
+        with mock.patch.object(mining_util.mp, 'Pool', side_effect=pool) as pools:
+            block = MiningJob(blockchain, batch_size=64).start().join(timeout=60)
+
+        self.assertIsNotNone(block)
+        self.assertEqual(pools.call_count, 1)
+        self.assertEqual(len(blockchain.proofs), 4)
+        for mined, proof in blockchain.proofs:
+            self.assertEqual(proof, serial_proof(mined))
+
+
+    def test_mined_block_is_reported_with_its_attempts(self):
+        blockchain = StaleBlockchain(rejections=0)
+        blockchain.mining_workers = 1
+        reported = []
+        job = MiningJob(blockchain, on_block=lambda block, attempts: reported.append((block, attempts)),
+                        batch_size=64)
+        block = job.start().join(timeout=60)
+
+        self.assertEqual(reported, [(block, job.attempts)])
+        self.assertGreater(job.attempts, block.proof)
+
+
+if __name__ == '__main__':
+    unittest.main()
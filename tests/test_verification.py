@@ -0,0 +1,67 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import utility.signature_util as signature_util
+from blockchain   import Blockchain
+from transaction  import Transaction
+from verification import Verification
+from wallet       import Wallet
+
+
+class SignatureBatchTest(unittest.TestCase):
+
+
+    @classmethod
+    def setUpClass(cls):
+        # three blocks of 70 signed transactions each, more than one chunk of signatures apiece
+        cls.cwd = os.getcwd()
+        cls.directory = tempfile.mkdtemp()
+        os.chdir(cls.directory)
+        wallet = Wallet()
+        wallet.create_keys()
+        blockchain = Blockchain(wallet.address, mining_workers=1, verify_workers=1)
+        for _ in range(5):
+            blockchain.mine_block()
+        for _ in range(3):
+            for n in range(70):
+                recipient = '{:040x}'.format(n)
+                blockchain.add_transaction(recipient, wallet.address, 0.25,
+                                           wallet.sign_transaction(wallet.address, recipient, 0.25), wallet.public_key)
+            blockchain.mine_block()
+        cls.chain = blockchain.chain
+        cls.public_key = wallet.public_key
+        blockchain.close()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.directory)
+
+
+    def test_one_pool_for_all_new_blocks(self):
+        self.assertEqual([len(block.transactions) for block in self.chain[6:]], [71] * 3)
+        pool = signature_util.mp.Pool
+        with mock.patch.object(signature_util.mp, 'Pool', side_effect=pool) as pools:
+            self.assertIsNone(Verification.first_invalid_block(self.chain, start=6, check_signatures=True,
+                                                               signature_workers=2))
+        self.assertEqual(pools.call_count, 1)
+
+
+    def test_bad_signature_is_found_in_its_block(self):
+        batch = [(index, tx, self.public_key) for index in (6, 7) for tx in self.chain[index].transactions[:-1]]
+        self.assertIsNone(Verification._first_invalid_signature(batch, 1))
+
+        tx = batch[100][1]
+        batch[100] = (7, Transaction(tx.sender, tx.recipient, tx.amount + 1, tx.signature), self.public_key)
+        self.assertEqual(Verification._first_invalid_signature(batch, 1), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,47 @@
 from collections import OrderedDict
 
+from address_table      import ADDRESSES, PUBLIC_KEYS
+from utility.codec_util import decode_transaction, encode_transaction
+
 
 class Transaction():
 
 
-    def __init__(self, sender, recipient, amount):
-        self.sender = sender
-        self.recipient = recipient
+    def __init__(self, sender, recipient, amount, signature=None, public_key=None):
+        # addresses are interned, in memory a transaction only holds their small integer ids
+        self.sender_id = ADDRESSES.intern(sender)
+        self.recipient_id = ADDRESSES.intern(recipient)
         self.amount = amount
+        # hex signature by the sender's key and that key, whose hash is the sender's address
+        # the key only comes with a sender's first transaction, later ones rely on it being known,
+        # see ledger_index.reveal_keys, and mining rewards have neither
+        self.signature = signature
+        self.public_key_id = None if public_key is None else PUBLIC_KEYS.intern(public_key)
+
+
+    @property
+    def sender(self):
+        return ADDRESSES.lookup(self.sender_id)
+
+
+    @property
+    def recipient(self):
+        return ADDRESSES.lookup(self.recipient_id)
+
+
+    @property
+    def public_key(self):
+        return None if self.public_key_id is None else PUBLIC_KEYS.lookup(self.public_key_id)
+
+
+    def with_public_key(self, public_key):
+        # the signature doesn't cover the key, so it can be added or left out without signing again
+        return Transaction(self.sender, self.recipient, self.amount, self.signature, public_key)
+
+
+    def __reduce__(self):
+        # ids only mean something in this process, a worker gets the addresses themselves
+        return (Transaction, (self.sender, self.recipient, self.amount, self.signature, self.public_key))
 
 
     def to_ordered_dict(self):
@@ -15,6 +49,37 @@ class Transaction():
         return OrderedDict([('sender', self.sender), ('recipient', self.recipient), ('amount', self.amount)])
 
 
+    @staticmethod
+    def from_dict(transaction):
+
+        return Transaction(transaction['sender'], transaction['recipient'], transaction['amount'],
+                           transaction.get('signature'), transaction.get('public_key'))
+
+
+    @staticmethod
+    def from_bytes(data):
+
+        return Transaction.from_dict(decode_transaction(data))
+
+
+    def to_dict(self):
+
+        transaction = {'sender': self.sender, 'recipient': self.recipient, 'amount': self.amount}
+        # unsigned transactions such as mining rewards leave the signature fields out
+        if self.signature is not None:
+            transaction['signature'] = self.signature
+        if self.public_key is not None:
+            transaction['public_key'] = self.public_key
+
+        return transaction
+
+
+    def to_bytes(self):
+
+        # compact binary form, see utility.codec_util
+        return encode_transaction(self)
+
+
     def __repr__(self):
 
-        return str(self.__dict__)
\ No newline at end of file
+        return str(self.to_dict())
\ No newline at end of file
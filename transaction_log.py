@@ -0,0 +1,75 @@
+import json
+import os
+
+from durability  import DurableLog
+from transaction import Transaction
+
+# write-ahead log of the open transactions: a header line naming the block they build on,
+# then one JSON record per admitted transaction
+TRANSACTION_LOG_FILE = 'open_transactions.log'
+
+
+class TransactionLog:
+
+
+    def __init__(self, path=TRANSACTION_LOG_FILE, durability=None):
+        self.path = path
+        # appends are group committed as configured, see durability
+        self.log  = DurableLog(path, durability)
+
+
+    def load(self, tip_height):
+        transactions = []
+        valid_size = 0
+        # records still in the write buffer, such as an import's, have to reach the file first
+        self.log.commit()
+        try:
+            with open(self.path, mode='rb') as f:
+                header = f.readline()
+                # once the pool was mined, the header names an older block and the records are stale
+                if not header.endswith(b'\n') or json.loads(header)['height'] != tip_height:
+                    raise ValueError('open transactions were confirmed')
+                valid_size = len(header)
+                for line in f:
+                    # a record without its newline was cut short by a crash while appending
+                    if not line.endswith(b'\n'):
+                        break
+                    transactions.append(Transaction.from_dict(json.loads(line)))
+                    valid_size += len(line)
+        except (IOError, ValueError, KeyError):
+            self.reset(tip_height)
+            return []
+
+        if valid_size != os.path.getsize(self.path):
+            self.log.truncate(valid_size)
+
+        return transactions
+
+
+    def append(self, transaction, wait=True):
+        # one record per admitted transaction, independent of pool and chain size
+        # with wait False the record is durable only after the next sync
+        try:
+            self.log.append((json.dumps(transaction.to_dict()) + '\n').encode(), wait)
+        except (IOError, OSError):
+            print('Saving transaction failed!')
+
+
+    def sync(self):
+        # returns once every record appended so far is committed
+        try:
+            self.log.sync()
+        except (IOError, OSError):
+            print('Saving transaction failed!')
+
+
+    def reset(self, tip_height):
+        # empty the log once its transactions are in the block at tip_height
+        try:
+            self.log.replace((json.dumps({'height': tip_height}) + '\n').encode())
+        except (IOError, OSError):
+            print('Saving transaction log failed!')
+
+
+    def close(self):
+        self.log.close()
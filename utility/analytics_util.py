@@ -0,0 +1,92 @@
+from address_table           import ADDRESSES
+from ledger_index            import account_id
+from utility.difficulty_util import block_time
+
+# numpy is only needed for analytics, the node runs without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _require_numpy():
+
+    if np is None:
+        raise ImportError('ledger analytics need numpy, install it with pip install numpy')
+
+
+def export_columns(chain):
+
+    # one row per confirmed transaction, in chain order
+    # sender and recipient are interned ids of the accounts, see ledger_index.account_id
+    _require_numpy()
+    count = sum(len(block.transactions) for block in chain)
+
+    block_index = np.empty(count, dtype=np.int64)
+    timestamp   = np.empty(count, dtype=np.float64)
+    sender      = np.empty(count, dtype=np.int64)
+    recipient   = np.empty(count, dtype=np.int64)
+    amount      = np.empty(count, dtype=np.float64)
+
+    row = 0
+    for block in chain:
+        seconds = block_time(block)
+        for tx in block.transactions:
+            block_index[row] = block.index
+            timestamp[row]   = seconds
+            sender[row]      = account_id(tx.sender_id)
+            recipient[row]   = account_id(tx.recipient_id)
+            amount[row]      = tx.amount
+            row += 1
+
+    return {
+        'block_index': block_index,
+        'timestamp': timestamp,
+        'sender': sender,
+        'recipient': recipient,
+        'amount': amount
+    }
+
+
+def save_columns(path, columns):
+
+    # addresses[id] resolves the sender and recipient columns without the node
+    _require_numpy()
+    addresses = np.array([ADDRESSES.lookup(address_id) for address_id in range(len(ADDRESSES))], dtype=str)
+    np.savez(path, addresses=addresses, **columns)
+
+
+def volume(columns, start=0, stop=None):
+
+    # total amount moved by blocks start to stop - 1, rows are sorted by block index
+    _require_numpy()
+    block_index = columns['block_index']
+    first = np.searchsorted(block_index, start, side='left')
+    last = len(block_index) if stop is None else np.searchsorted(block_index, stop, side='left')
+
+    return float(columns['amount'][first:last].sum())
+
+
+def all_balances(columns):
+
+    # balance of every address id at once, indexed by id
+    _require_numpy()
+    size = len(ADDRESSES)
+    received = np.bincount(columns['recipient'], weights=columns['amount'], minlength=size)
+    sent = np.bincount(columns['sender'], weights=columns['amount'], minlength=size)
+
+    return received - sent
+
+
+def top_holders(columns, n=10):
+
+    # (address, balance) of the n largest balances, largest first
+    _require_numpy()
+    balances = all_balances(columns)
+    n = min(n, len(balances))
+    if n == 0:
+        return []
+    top = np.argpartition(balances, -n)[-n:]
+    top = top[np.argsort(balances[top])[::-1]]
+
+    return [(ADDRESSES.lookup(int(address_id)), float(balances[address_id])) for address_id in top]
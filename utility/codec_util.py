@@ -0,0 +1,465 @@
+import math
+import struct
+from datetime  import datetime, timedelta
+from functools import lru_cache
+
+# first byte of every encoding, bump it when the layout changes, older ones stay readable
+# it can never be '{', so a store can tell binary records from JSON ones
+# version 1 tags every field, see _write_value
+TAGGED_LAYOUT = 1
+# version 2 tags the header fields but stores a block's transactions column by column,
+# so they decode with a few struct and hex calls instead of one python step per field
+COLUMN_LAYOUT = 2
+CODEC_VERSION = COLUMN_LAYOUT
+
+# amounts that are a whole number of 10 ** -8 are stored as that integer
+FIXED_POINT_SCALE = 10 ** 8
+
+# every field starts with one of these tags, so a field keeps its exact type and value
+# and a decoded block hashes to the same value as the original
+TAG_NONE  = 0
+# int of up to 64 bits, zigzag varint
+TAG_INT   = 1
+# float with a fixed point representation, zigzag varint of amount * FIXED_POINT_SCALE
+TAG_FIXED = 2
+# any other float, 8 bytes big endian
+TAG_FLOAT = 3
+# lowercase hex string such as a hash, key or signature, varint length + raw bytes
+TAG_HEX   = 4
+# str(datetime) timestamp, zigzag varint of microseconds since EPOCH
+TAG_TIME  = 5
+# any other string, varint length + utf-8
+TAG_TEXT  = 6
+# int of more than 64 bits such as a target, varint length + zigzag value as big endian bytes
+TAG_BIG   = 7
+
+# ints from here on up, in zigzag form, are stored as TAG_BIG
+BIG_INT = 2 ** 64
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+_double = struct.Struct('>d')
+
+# longest string and largest fixed point amount a column can hold
+MAX_COLUMN_LENGTH = 0xffff
+MAX_COLUMN_AMOUNT = 2 ** 63
+
+
+def _write_varint(out, value):
+
+    # LEB128, 7 bits per byte, low bits first
+    if value < 0x80:
+        out.append(value)
+        return
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset):
+
+    # one and two byte values, such as lengths of keys and signatures, skip the loop
+    value = data[offset]
+    if value < 0x80:
+        return value, offset + 1
+    second = data[offset + 1]
+    if second < 0x80:
+        return (value & 0x7f) | (second << 7), offset + 2
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _write_signed(out, value):
+
+    # zigzag, small negative numbers stay short too
+    _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+
+def _read_signed(data, offset):
+
+    value, offset = _read_varint(data, offset)
+
+    return (value >> 1) ^ -(value & 1), offset
+
+
+def _write_bytes(out, value):
+
+    _write_varint(out, len(value))
+    out += value
+
+
+def _timestamp_micros(value):
+
+    # None unless value is exactly what str() of a naive datetime gives back
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if moment.tzinfo is not None or str(moment) != value:
+        return None
+
+    return (moment - EPOCH) // MICROSECOND
+
+
+def _hex_bytes(value):
+
+    # None unless value is exactly what bytes.hex() gives back
+    if len(value) % 2 != 0:
+        return None
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError:
+        return None
+    if raw.hex() != value:
+        return None
+
+    return raw
+
+
+def _write_value(out, value):
+
+    # strings first, they are most of a block
+    if isinstance(value, str):
+        raw = _hex_bytes(value)
+        if raw is not None:
+            out.append(TAG_HEX)
+            _write_bytes(out, raw)
+            return
+        micros = _timestamp_micros(value)
+        if micros is not None:
+            out.append(TAG_TIME)
+            _write_signed(out, micros)
+            return
+        out.append(TAG_TEXT)
+        _write_bytes(out, value.encode())
+    elif value is None:
+        out.append(TAG_NONE)
+    elif isinstance(value, bool):
+        # json writes true and false, not 1 and 0
+        raise TypeError('cannot encode {!r}'.format(value))
+    elif isinstance(value, int):
+        zigzag = value * 2 if value >= 0 else -value * 2 - 1
+        if zigzag >= BIG_INT:
+            # a varint costs a python step per 7 bits, from_bytes reads the whole number at once
+            out.append(TAG_BIG)
+            _write_bytes(out, zigzag.to_bytes((zigzag.bit_length() + 7) // 8, 'big'))
+            return
+        out.append(TAG_INT)
+        _write_varint(out, zigzag)
+    elif isinstance(value, float):
+        scaled = value * FIXED_POINT_SCALE
+        # very large amounts overflow once scaled
+        if math.isfinite(scaled):
+            fixed = round(scaled)
+            # comparing hex also tells 0.0 from -0.0
+            if (fixed / FIXED_POINT_SCALE).hex() == value.hex():
+                out.append(TAG_FIXED)
+                _write_signed(out, fixed)
+                return
+        out.append(TAG_FLOAT)
+        out += _double.pack(value)
+    else:
+        raise TypeError('cannot encode {!r}'.format(value))
+
+
+def _read_value(data, offset):
+
+    tag = data[offset]
+    offset += 1
+    if tag == TAG_HEX or tag == TAG_TEXT:
+        length, offset = _read_varint(data, offset)
+        raw = data[offset:offset + length]
+        return raw.hex() if tag == TAG_HEX else bytes(raw).decode(), offset + length
+    if tag == TAG_NONE:
+        return None, offset
+    if tag == TAG_INT:
+        return _read_signed(data, offset)
+    if tag == TAG_FIXED:
+        fixed, offset = _read_signed(data, offset)
+        return fixed / FIXED_POINT_SCALE, offset
+    if tag == TAG_FLOAT:
+        return _double.unpack_from(data, offset)[0], offset + 8
+    if tag == TAG_TIME:
+        micros, offset = _read_signed(data, offset)
+        return str(EPOCH + micros * MICROSECOND), offset
+    if tag == TAG_BIG:
+        length, offset = _read_varint(data, offset)
+        zigzag = int.from_bytes(data[offset:offset + length], 'big')
+        return (zigzag >> 1) ^ -(zigzag & 1), offset + length
+
+    raise ValueError('unknown field tag {}'.format(tag))
+
+
+def _write_transaction(out, transaction):
+
+    _write_value(out, transaction.sender)
+    _write_value(out, transaction.recipient)
+    _write_value(out, transaction.amount)
+    _write_value(out, transaction.signature)
+    _write_value(out, transaction.public_key)
+
+
+def _read_fields(data, offset, count):
+
+    # count values in a row, hex strings and None are most of them and are read inline
+    fields = []
+    for _ in range(count):
+        tag = data[offset]
+        if tag == TAG_HEX:
+            length = data[offset + 1]
+            if length < 0x80:
+                start = offset + 2
+            else:
+                length, start = _read_varint(data, offset + 1)
+            offset = start + length
+            fields.append(data[start:offset].hex())
+        elif tag == TAG_NONE:
+            fields.append(None)
+            offset += 1
+        else:
+            value, offset = _read_value(data, offset)
+            fields.append(value)
+
+    return fields, offset
+
+
+def _as_dict(fields):
+
+    # same shape as Transaction.to_dict
+    sender, recipient, amount, signature, public_key = fields
+    transaction = {'sender': sender, 'recipient': recipient, 'amount': amount}
+    if signature is not None:
+        transaction['signature'] = signature
+    if public_key is not None:
+        transaction['public_key'] = public_key
+
+    return transaction
+
+
+def _write_columns(out, transactions):
+
+    # string fields as a kind per field (TAG_NONE, TAG_HEX or TAG_TEXT) and a length per field,
+    # amounts as a kind (TAG_INT or TAG_FIXED) and an int64 per transaction, then every hex
+    # string's bytes as one blob and every other string's utf-8 as another
+    # returns False, writing nothing, for transactions that only the tagged layout can hold
+    kinds = bytearray()
+    lengths = []
+    amount_kinds = bytearray()
+    amounts = []
+    hex_blob = bytearray()
+    text_blob = bytearray()
+    for transaction in transactions:
+        for value in (transaction.sender, transaction.recipient, transaction.signature, transaction.public_key):
+            if value is None:
+                kinds.append(TAG_NONE)
+                lengths.append(0)
+                continue
+            if type(value) is not str:
+                return False
+            raw = _hex_bytes(value)
+            if raw is not None:
+                kinds.append(TAG_HEX)
+                hex_blob += raw
+            else:
+                raw = value.encode()
+                kinds.append(TAG_TEXT)
+                text_blob += raw
+            if len(raw) > MAX_COLUMN_LENGTH:
+                return False
+            lengths.append(len(raw))
+
+        amount = transaction.amount
+        if type(amount) is int:
+            amount_kinds.append(TAG_INT)
+        elif type(amount) is float:
+            scaled = amount * FIXED_POINT_SCALE
+            if not math.isfinite(scaled):
+                return False
+            fixed = round(scaled)
+            if (fixed / FIXED_POINT_SCALE).hex() != amount.hex():
+                return False
+            amount = fixed
+            amount_kinds.append(TAG_FIXED)
+        else:
+            return False
+        if not -MAX_COLUMN_AMOUNT <= amount < MAX_COLUMN_AMOUNT:
+            return False
+        amounts.append(amount)
+
+    out += kinds
+    out += amount_kinds
+    out += _column_struct(len(amounts)).pack(*lengths, *amounts)
+    _write_bytes(out, hex_blob)
+    _write_bytes(out, text_blob)
+
+    return True
+
+
+@lru_cache(maxsize=256)
+def _column_struct(count):
+
+    # the string lengths and amounts of count transactions
+    return struct.Struct('<{}H{}q'.format(count * 4, count))
+
+
+def _read_columns(data, offset, count):
+
+    field_count = count * 4
+    kinds = data[offset:offset + field_count]
+    offset += field_count
+    amount_kinds = data[offset:offset + count]
+    offset += count
+    columns = _column_struct(count)
+    numbers = columns.unpack_from(data, offset)
+    lengths = numbers[:field_count]
+    amounts = numbers[field_count:]
+    offset += columns.size
+    length, offset = _read_varint(data, offset)
+    # one hex() for all of them, each field is then a slice of the string
+    hex_text = data[offset:offset + length].hex()
+    offset += length
+    length, offset = _read_varint(data, offset)
+    text_blob = bytes(data[offset:offset + length])
+    offset += length
+
+    values = []
+    hex_position = 0
+    text_position = 0
+    for kind, length in zip(kinds, lengths):
+        if kind == TAG_HEX:
+            end = hex_position + 2 * length
+            values.append(hex_text[hex_position:end])
+            hex_position = end
+        elif kind == TAG_TEXT:
+            end = text_position + length
+            values.append(text_blob[text_position:end].decode())
+            text_position = end
+        elif kind == TAG_NONE:
+            values.append(None)
+        else:
+            raise ValueError('unknown field kind {}'.format(kind))
+
+    transactions = []
+    for position in range(count):
+        sender, recipient, signature, public_key = values[position * 4:position * 4 + 4]
+        amount = amounts[position]
+        if amount_kinds[position] == TAG_FIXED:
+            amount = amount / FIXED_POINT_SCALE
+        transactions.append([sender, recipient, amount, signature, public_key])
+
+    return transactions, offset
+
+
+def _check_version(data, offset=0, versions=(TAGGED_LAYOUT, COLUMN_LAYOUT)):
+
+    if offset >= len(data) or data[offset] not in versions:
+        raise ValueError('unsupported encoding version {}'.format(data[offset] if offset < len(data) else None))
+
+    return offset + 1
+
+
+def encode_transaction(transaction):
+
+    # a transaction on its own is always tagged
+    out = bytearray([TAGGED_LAYOUT])
+    _write_transaction(out, transaction)
+
+    return bytes(out)
+
+
+def decode_transaction(data):
+
+    # a dict for Transaction.from_dict
+    fields, _ = _read_fields(data, _check_version(data, versions=(TAGGED_LAYOUT,)), 5)
+
+    return _as_dict(fields)
+
+
+def _write_header(out, block):
+
+    _write_varint(out, block.index)
+    _write_value(out, block.previous_hash)
+    _write_value(out, block.timestamp)
+    _write_value(out, block.proof)
+    _write_value(out, block.target)
+    _write_value(out, block.merkle_root)
+    _write_varint(out, len(block.transactions))
+
+
+def encode_block(block):
+
+    out = bytearray([COLUMN_LAYOUT])
+    _write_header(out, block)
+    if _write_columns(out, block.transactions):
+        return bytes(out)
+
+    # amounts or strings the columns can't hold exactly
+    out = bytearray([TAGGED_LAYOUT])
+    _write_header(out, block)
+    for transaction in block.transactions:
+        _write_transaction(out, transaction)
+
+    return bytes(out)
+
+
+def read_header(data, offset=0):
+
+    # decodes every field of the block starting at data[offset] but its transactions,
+    # returns them as a dict together with the offset of the transactions, see read_transactions
+    offset = _check_version(data, offset)
+    index, offset = _read_varint(data, offset)
+    (previous_hash, timestamp, proof, target, merkle_root), offset = _read_fields(data, offset, 5)
+    count, offset = _read_varint(data, offset)
+
+    return {
+        'index': index,
+        'previous_hash': previous_hash,
+        'timestamp': timestamp,
+        'proof': proof,
+        'target': target,
+        'merkle_root': merkle_root,
+        'transaction_count': count
+    }, offset
+
+
+def read_transactions(data, offset, count, layout):
+
+    # the count transactions after a header as lists of Transaction's arguments, in order,
+    # and the offset just past them, layout is the first byte of the block's encoding
+    if layout == COLUMN_LAYOUT:
+        return _read_columns(data, offset, count)
+    transactions = []
+    for _ in range(count):
+        fields, offset = _read_fields(data, offset, 5)
+        transactions.append(fields)
+
+    return transactions, offset
+
+
+def read_block(data, offset=0):
+
+    # decodes the block starting at data[offset], returns it as a dict for Block.from_dict
+    # together with the offset just past it, encodings need no delimiter between them
+    # read_header checks the version byte, which also names the layout of the transactions
+    block, end = read_header(data, offset)
+    transactions, end = read_transactions(data, end, block.pop('transaction_count'), data[offset])
+    block['transactions'] = [_as_dict(fields) for fields in transactions]
+
+    return block, end
+
+
+def decode_block(data):
+
+    # a dict for Block.from_dict, data can be any bytes-like object
+    block, _ = read_block(data)
+
+    return block
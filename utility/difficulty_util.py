@@ -0,0 +1,73 @@
+import time
+from datetime import datetime, timezone
+
+# a proof is valid when the sha512 digest, read as an integer, is below the block's target
+# 2 ** 504 is the old rule of a leading '00' in the hex digest, blocks without a target use it
+INITIAL_TARGET = 2 ** 504
+MAX_TARGET = 2 ** 512 - 1
+# the target is recomputed every RETARGET_WINDOW blocks ...
+RETARGET_WINDOW = 10
+# ... aiming for this many seconds between two blocks
+BLOCK_INTERVAL = 60
+# and one retarget moves it by at most this factor either way
+MAX_ADJUSTMENT = 4
+# retargeting trusts block timestamps, so a block has to be stamped later than the median
+# of the MEDIAN_TIME_SPAN blocks before it and at most MAX_FUTURE_DRIFT seconds ahead of the clock
+MEDIAN_TIME_SPAN = 11
+MAX_FUTURE_DRIFT = 2 * 60 * 60
+
+
+def meets_target(digest, target):
+
+    return int.from_bytes(digest, 'big') < target
+
+
+def block_target(block):
+
+    return block.target if block.target is not None else INITIAL_TARGET
+
+
+def block_time(block):
+
+    # seconds since the epoch, timestamps are utc strings apart from the genesis block's 0
+    if isinstance(block.timestamp, (int, float)):
+        return float(block.timestamp)
+
+    return datetime.fromisoformat(block.timestamp).replace(tzinfo=timezone.utc).timestamp()
+
+
+def median_time_past(chain, height, span=MEDIAN_TIME_SPAN):
+
+    times = sorted(block_time(block) for block in chain[max(0, height - span):height])
+
+    return times[len(times) // 2]
+
+
+def valid_block_time(chain, height, now=None):
+
+    # whether the timestamp of chain[height] fits the blocks before it and the current time
+    now = time.time() if now is None else now
+    try:
+        seconds = block_time(chain[height])
+    except (ValueError, TypeError):
+        return False
+
+    return median_time_past(chain, height) < seconds <= now + MAX_FUTURE_DRIFT
+
+
+def target_for_height(chain, height, window=RETARGET_WINDOW, interval=BLOCK_INTERVAL):
+
+    # target the block at chain[height] has to meet, only chain[:height] is looked at
+    last_target = block_target(chain[height - 1])
+    # the genesis block has no real timestamp, so the first window starts at block 1
+    if height % window != 0 or height <= window:
+        return last_target
+
+    expected = interval * (window - 1)
+    actual = block_time(chain[height - 1]) - block_time(chain[height - window])
+    actual = min(max(actual, expected / MAX_ADJUSTMENT), expected * MAX_ADJUSTMENT)
+
+    # integer milliseconds keep the new target exact for every node that recomputes it
+    new_target = last_target * int(actual * 1000) // int(expected * 1000)
+
+    return max(1, min(MAX_TARGET, new_target))
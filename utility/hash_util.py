@@ -6,9 +6,72 @@ def hash_string_512(string):
     return hl.sha512(string).hexdigest()
 
 
+def midstate_512(prefix):
+
+    # sha512 state with the prefix absorbed, copy() it to hash prefix + suffix
+    return hl.sha512(prefix)
+
+
+def serialize_transaction(transaction):
+
+    # a merkle leaf, it commits to the signature and key too so neither can be swapped under a block hash
+    # unsigned transactions leave both out and serialize as before they existed
+    return json.dumps(transaction.to_dict()).encode()
+
+
+def hash_transaction(transaction):
+
+    return hash_string_512(serialize_transaction(transaction))
+
+
+def hash_pair(left, right):
+
+    return hash_string_512((left + right).encode())
+
+
+def merkle_root(tx_hashes):
+
+    if len(tx_hashes) == 0:
+        return hash_string_512(b'')
+
+    # hash neighbours pairwise up to a single root, an odd one out is paired with itself
+    level = list(tx_hashes)
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level.append(level[-1])
+        level = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+
+    return level[0]
+
+
+def header_prefix(block):
+
+    # every header field but the proof, which goes last so mining can reuse a midstate
+    return json.dumps([block.index, block.previous_hash, block.merkle_root, block.timestamp, block.target]).encode()
+
+
 def hash_block(block):
 
-    hashable_block = block.__dict__.copy()
-    hashable_block['transactions'] = [tx.to_ordered_dict() for tx in hashable_block['transactions']]
+    # blocks compute their hash once and keep it, see Block.hash
+    return block.hash
+
+
+def compute_block_hash(block):
+
+    # the header commits to the transactions through the merkle root, so their number doesn't matter
+    if block.merkle_root is not None:
+        return hash_string_512(header_prefix(block) + str(block.proof).encode())
+
+    # blocks from before merkle roots hash all their fields, and blocks from before
+    # per block targets were hashed without that field
+    hashable_block = {
+        'index': block.index,
+        'previous_hash': block.previous_hash,
+        'timestamp': block.timestamp,
+        'transactions': [tx.to_ordered_dict() for tx in block.transactions],
+        'proof': block.proof
+    }
+    if block.target is not None:
+        hashable_block['target'] = block.target
     
     return hash_string_512(json.dumps(hashable_block, sort_keys=True).encode())
\ No newline at end of file
@@ -0,0 +1,103 @@
+import multiprocessing as mp
+from collections import deque
+
+from utility.hash_util import header_prefix, midstate_512
+from verification      import Verification
+
+# number of proofs handed to a worker at once
+CHUNK_SIZE = 20000
+# how often (in proofs) a worker checks whether a smaller proof was already found
+CHECK_INTERVAL = 1024
+
+# per worker state, _found is set once by _init_worker, the midstate whenever a task
+# brings the header of another block
+_found = None
+_prefix = None
+_midstate = None
+
+
+def _init_worker(found):
+
+    global _found
+    _found = found
+
+
+def _search_range(prefix, target, start, stop):
+
+    global _prefix, _midstate
+    if prefix != _prefix:
+        _prefix = prefix
+        _midstate = midstate_512(prefix)
+    for proof in range(start, stop):
+        # give up once another worker holds a smaller proof, it wins either way
+        if proof % CHECK_INTERVAL == 0 and 0 <= _found.value < proof:
+            return None
+        if Verification.valid_proof_from_midstate(_midstate, proof, target):
+            with _found.get_lock():
+                if _found.value < 0 or proof < _found.value:
+                    _found.value = proof
+            return proof
+
+    return None
+
+
+class ProofSearch:
+
+    # a pool of workers searching proofs range by range, each search names its block, so one pool
+    # serves every block a miner works on, a task carries the header and its worker derives the midstate
+    def __init__(self, workers, chunk_size=CHUNK_SIZE):
+        self.workers    = workers
+        self.chunk_size = chunk_size
+        # smallest proof found so far by any worker in the current search, -1 while none
+        self._found     = mp.Value('q', -1)
+        self._pool      = mp.Pool(workers, initializer=_init_worker, initargs=(self._found,))
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def search(self, block, start, stop):
+        # smallest valid proof for block in range(start, stop), or None
+        # chunks are collected in the order they were handed out, so the first hit
+        # is the smallest valid proof, the same one the serial loop would return
+        prefix = header_prefix(block)
+        self._found.value = -1
+        pending = deque()
+        next_start = start
+        while next_start < stop or pending:
+            while next_start < stop and len(pending) < self.workers * 2:
+                chunk_stop = min(next_start + self.chunk_size, stop)
+                pending.append(self._pool.apply_async(_search_range, (prefix, block.target, next_start, chunk_stop)))
+                next_start = chunk_stop
+            proof = pending.popleft().get()
+            if proof is not None:
+                # the chunks after it give up within CHECK_INTERVAL proofs, once they did the next
+                # search can reset the found proof without them setting it again
+                for result in pending:
+                    result.wait()
+                return proof
+
+        return None
+
+
+    def close(self):
+        # terminates every worker still searching
+        self._pool.terminate()
+        self._pool.join()
+
+
+def parallel_proof_of_work(block, workers, chunk_size=CHUNK_SIZE):
+
+    with ProofSearch(workers, chunk_size) as search:
+        start = 0
+        while True:
+            stop = start + chunk_size * workers * 4
+            proof = search.search(block, start, stop)
+            if proof is not None:
+                return proof
+            start = stop
@@ -0,0 +1,43 @@
+import multiprocessing as mp
+
+from wallet import Wallet
+
+# transactions per task, enough RSA work to outweigh sending the chunk to a worker
+CHUNK_SIZE = 64
+
+
+def verify_signature(transaction, public_key=None):
+
+    if transaction.signature is None:
+        return False
+    try:
+        return Wallet.verify_transaction(transaction, public_key)
+    except (ValueError, TypeError, IndexError):
+        # not a hex encoded key or signature
+        return False
+
+
+def _verify_chunk(signed):
+
+    return [verify_signature(tx, public_key) for tx, public_key in signed]
+
+
+def verify_signatures(transactions, workers=1, chunk_size=CHUNK_SIZE, keys=None):
+
+    # one result per transaction, in order
+    # keys holds the key to check each transaction against, None for the one it carries
+    transactions = list(transactions)
+    signed = list(zip(transactions, keys if keys is not None else [None] * len(transactions)))
+    chunks = [signed[i:i + chunk_size] for i in range(0, len(signed), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        return _verify_chunk(signed)
+
+    try:
+        # each worker keeps its own Wallet.get_verifier cache for the senders it sees
+        with mp.Pool(min(workers, len(chunks))) as pool:
+            results = pool.map(_verify_chunk, chunks)
+    except (OSError, ImportError):
+        # no usable multiprocessing on this platform
+        return _verify_chunk(signed)
+
+    return [valid for chunk in results for valid in chunk]
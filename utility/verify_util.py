@@ -0,0 +1,57 @@
+import multiprocessing as mp
+
+from verification import Verification
+
+# blocks checked per task, small enough to keep every worker busy until the end
+RANGE_SIZE = 2000
+
+# per worker state, set once by _init_worker
+_chain = None
+_retarget_window = None
+_block_interval = None
+_check_signatures = None
+_keys = None
+
+
+def _init_worker(chain, retarget_window, block_interval, check_signatures, keys):
+
+    global _chain, _retarget_window, _block_interval, _check_signatures, _keys
+    _chain = chain
+    _retarget_window = retarget_window
+    _block_interval = block_interval
+    _check_signatures = check_signatures
+    _keys = keys
+
+
+def _check_range(bounds):
+
+    start, stop = bounds
+
+    return Verification.first_invalid_block(_chain, _retarget_window, _block_interval, start, stop, _check_signatures,
+                                            keys=_keys)
+
+
+def parallel_first_invalid_block(chain, retarget_window, block_interval, workers, range_size=RANGE_SIZE,
+                                 check_signatures=False, keys=None):
+
+    # a block check only reads the blocks up to one retarget window below it, so ranges are independent
+    # apart from the public keys revealed before them, which are found once up front unless given
+    ranges = [(start, min(start + range_size, len(chain))) for start in range(1, len(chain), range_size)]
+
+    if workers <= 1 or len(ranges) <= 1:
+        # too short to split, a large block can still spread its signatures over the workers
+        return Verification.first_invalid_block(chain, retarget_window, block_interval,
+                                                check_signatures=check_signatures, signature_workers=workers,
+                                                keys=keys)
+
+    if check_signatures and keys is None:
+        keys = Verification.revealed_keys(chain)
+    # workers get the chain once at startup, a forked worker shares it without copying
+    with mp.Pool(min(workers, len(ranges)), initializer=_init_worker,
+                 initargs=(chain, retarget_window, block_interval, check_signatures, keys)) as pool:
+        # results come back in range order, so the first failure seen is the lowest failing index
+        for invalid in pool.imap(_check_range, ranges):
+            if invalid is not None:
+                return invalid
+
+    return None
@@ -1,16 +1,47 @@
-from utility.hash_util import hash_string_512, hash_block
+from utility.difficulty_util import INITIAL_TARGET, RETARGET_WINDOW, BLOCK_INTERVAL, block_target, meets_target, target_for_height, valid_block_time
+from utility.hash_util       import hash_string_512, hash_block, hash_transaction, header_prefix, merkle_root, midstate_512
+from ledger_index            import account_id, reveal_keys, revealed_key
+from utility.signature_util  import verify_signatures
+
+# The reward we give to miners (for creating a new block)
+MINING_REWARD = 10
+# transactions whose signatures are checked by one verify_signatures call, see first_invalid_block
+SIGNATURE_BATCH = 10000
 
 class Verification:
 
 
     @staticmethod
-    def valid_proof(transactions, last_hash, proof):
+    def valid_proof(transactions, last_hash, proof, target=INITIAL_TARGET):
 
         guess = (str([tx.to_ordered_dict() for tx in transactions]) +  str(last_hash) + str(proof)).encode()
         guess_hash = hash_string_512(guess)
 
-        return guess_hash[0:2] == '00'
-        
+        return int(guess_hash, 16) < target
+
+
+    @staticmethod
+    def valid_header(block):
+
+        # the hash of the whole header, proof included, has to be below the block's target
+        return int(hash_block(block), 16) < block_target(block)
+
+
+    @staticmethod
+    def header_midstate(block):
+
+        # only the proof changes while mining, so absorb the rest of the header once
+        return midstate_512(header_prefix(block))
+
+
+    @staticmethod
+    def valid_proof_from_midstate(midstate, proof, target=INITIAL_TARGET):
+
+        guess_hash = midstate.copy()
+        guess_hash.update(str(proof).encode())
+
+        return meets_target(guess_hash.digest(), target)
+
 
     @staticmethod
     def verify_transaction(transaction, get_balance):
@@ -19,24 +50,144 @@ class Verification:
 
         return sender_balance >= transaction.amount
 
+    @staticmethod
+    def verify_transactions(open_transactions, confirmed_balances):
+
+        # one pass in admission order, each sender has to cover the amount from its
+        # confirmed balance plus whatever earlier open transactions moved
+        # balances are keyed by account, see ledger_index.account_id
+        balances = dict(confirmed_balances)
+        for tx in open_transactions:
+            sender, recipient = account_id(tx.sender_id), account_id(tx.recipient_id)
+            sender_balance = balances.get(sender, 0)
+            if sender_balance < tx.amount:
+                return False
+            balances[sender] = sender_balance - tx.amount
+            balances[recipient] = balances.get(recipient, 0) + tx.amount
+
+        return True
+
+
+    @staticmethod
+    def is_mining_reward(block, position):
+
+        # the only unsigned transaction a block may hold: the reward, closing the block
+        transaction = block.transactions[position]
+
+        return (position == len(block.transactions) - 1 and transaction.sender == 'MINING'
+                and transaction.amount == MINING_REWARD)
+
+
+    @staticmethod
+    def revealed_keys(blockchain, stop=None):
+
+        # the public keys revealed in blockchain[1:stop], see ledger_index.reveal_keys
+        keys = {}
+        for block in blockchain[1:stop]:
+            reveal_keys(keys, block)
+
+        return keys
+
+
     @classmethod
-    def verify_transactions(cls, open_transactions, get_balance):
+    def verify_chain(cls, blockchain, retarget_window=RETARGET_WINDOW, block_interval=BLOCK_INTERVAL, start=1,
+                     check_signatures=False):
 
-        return all([cls.verify_transaction(tx, get_balance) for tx in open_transactions])
+        return cls.first_invalid_block(blockchain, retarget_window, block_interval, start,
+                                       check_signatures=check_signatures) is None
 
 
     @classmethod
-    def verify_chain(cls, blockchain):
+    def first_invalid_block(cls, blockchain, retarget_window=RETARGET_WINDOW, block_interval=BLOCK_INTERVAL,
+                            start=1, stop=None, check_signatures=False, signature_workers=1, keys=None):
+
+        # index of the first bad block in blockchain[start:stop], or None if they all check out
+        # blocks below start are taken as verified, no check looks further back than one retarget window
+        # keys are the public keys revealed in the chain, found by a pass over it unless given
+        stop = len(blockchain) if stop is None else stop
+        if check_signatures and keys is None:
+            keys = cls.revealed_keys(blockchain, stop)
+        # signatures of consecutive blocks are checked together, so a pool of signature_workers
+        # is started once per SIGNATURE_BATCH transactions rather than once per block
+        batch = []
+        for index in range(max(start, 1), stop):
+            if not cls.valid_block(blockchain, index, retarget_window, block_interval):
+                # a block below it may still hold a bad signature
+                invalid = cls._first_invalid_signature(batch, signature_workers)
+
+                return invalid if invalid is not None else index
+            block = blockchain[index]
+            # every transaction but the closing mining reward is signed by its sender, with the key it
+            # carries or the one its sender revealed before, blocks from before merkle roots are not checked
+            if check_signatures and block.merkle_root is not None:
+                batch.extend((index, tx, revealed_key(keys, tx, index, position))
+                             for position, tx in enumerate(block.transactions)
+                             if not cls.is_mining_reward(block, position))
+                if len(batch) >= SIGNATURE_BATCH:
+                    invalid = cls._first_invalid_signature(batch, signature_workers)
+                    if invalid is not None:
+                        return invalid
+                    batch = []
+
+        return cls._first_invalid_signature(batch, signature_workers)
+
+
+    @staticmethod
+    def _first_invalid_signature(batch, workers):
+
+        # index of the first block in batch, a list of (block index, transaction, key), with a bad signature
+        signatures_valid = verify_signatures([tx for _, tx, _ in batch], workers, keys=[key for _, _, key in batch])
+        for (index, _, _), signature_valid in zip(batch, signatures_valid):
+            if not signature_valid:
+                print('Transaction signature is invalid')
+
+                return index
+
+        return None
 
-        for (index, block) in enumerate(blockchain):
-            if index == 0:
-                continue
-            if block.previous_hash != hash_block(blockchain[index - 1]):
+
+    @classmethod
+    def valid_block(cls, blockchain, index, retarget_window=RETARGET_WINDOW, block_interval=BLOCK_INTERVAL):
+
+        # every check of the block at index but its signatures
+        block = blockchain[index]
+        if block.previous_hash != hash_block(blockchain[index - 1]):
+
+            return False
+        # only blocks from before per block targets may leave it out, they were mined against INITIAL_TARGET
+        if block.target is None:
+            if blockchain[index - 1].target is not None:
+                print('Block target is missing')
 
                 return False
-            if not cls.valid_proof(block.transactions[:-1], block.previous_hash, block.proof):
+        elif block.target != target_for_height(blockchain, index, retarget_window, block_interval):
+            print('Block target is invalid')
+
+            return False
+        # targets are retargeted from timestamps, so a block with a target needs a believable one
+        elif not valid_block_time(blockchain, index):
+            print('Block timestamp is invalid')
+
+            return False
+        # same for merkle roots, blocks without one were mined over their transactions
+        if block.merkle_root is None:
+            if blockchain[index - 1].merkle_root is not None:
+                print('Merkle root is missing')
+
+                return False
+            if not cls.valid_proof(block.transactions[:-1], block.previous_hash, block.proof, block_target(block)):
                 print('Proof of work is invalid')
 
                 return False
 
-        return True
\ No newline at end of file
+            return True
+        if block.merkle_root != merkle_root([hash_transaction(tx) for tx in block.transactions]):
+            print('Merkle root is invalid')
+
+            return False
+        if not cls.valid_header(block):
+            print('Proof of work is invalid')
+
+            return False
+
+        return True
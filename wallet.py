@@ -5,6 +5,13 @@ from Crypto.Hash      import SHA512
 
 import Crypto.Random
 import binascii
+import hashlib as hl
+from functools import lru_cache
+
+# number of imported sender keys kept around for signature checks
+VERIFIER_CACHE_SIZE = 1024
+# hex digits of the public key hash used as an address
+ADDRESS_LENGTH = 40
 
 
 class Wallet:
@@ -13,6 +20,7 @@ class Wallet:
 
         self.private_key = None
         self.public_key = None
+        self.address = None
 
 
     def create_keys(self):
@@ -20,6 +28,7 @@ class Wallet:
         private_key, public_key = self.generate_keys()
         self.private_key = private_key
         self.public_key = public_key
+        self.address = self.address_from_key(public_key)
 
 
     def save_keys(self):
@@ -43,6 +52,7 @@ class Wallet:
                 private_key = keys[1]
                 self.public_key = public_key
                 self.private_key = private_key
+                self.address = self.address_from_key(public_key)
         except (IOError, IndexError):
             print('Loading failed!')
 
@@ -70,10 +80,48 @@ class Wallet:
 
 
     @staticmethod
-    def verify_transaction(transaction):
+    def address_from_key(public_key):
+
+        # the full hex DER key is ~324 characters, transactions only carry this short hash of it
+        return hl.sha256(binascii.unhexlify(public_key)).hexdigest()[:ADDRESS_LENGTH]
+
+
+    @staticmethod
+    @lru_cache(maxsize=VERIFIER_CACHE_SIZE)
+    def get_verifier(public_key):
+
+        # parsing the DER key dominates a signature check, so each sender's key is parsed once
+        return PKCS1_v1_5.new(RSA.importKey(binascii.unhexlify(public_key)))
+
+
+    @staticmethod
+    def verifier_cache_info():
 
-        public_key = RSA.importKey(binascii.unhexlify(transaction.sender))
-        verifier = PKCS1_v1_5.new(public_key)
+        # hits, misses, maxsize and currsize of the get_verifier cache
+        return Wallet.get_verifier.cache_info()
+
+
+    @staticmethod
+    def key_matches(public_key, address):
+
+        try:
+            return Wallet.address_from_key(public_key) == address
+        except (ValueError, TypeError):
+            # not a hex encoded key
+            return False
+
+
+    @staticmethod
+    def verify_transaction(transaction, public_key=None):
+
+        # signed transactions are checked against the sender's key, which has to hash to the sender's address
+        # it comes with the transaction or, for a sender that revealed it before, is passed in
+        # older ones were sent from the full key itself
+        if public_key is None:
+            public_key = transaction.public_key if transaction.public_key is not None else transaction.sender
+        if public_key != transaction.sender and Wallet.address_from_key(public_key) != transaction.sender:
+            return False
+        verifier = Wallet.get_verifier(public_key)
         hashed = SHA512.new(
             (str(transaction.sender) 
                 + str(transaction.recipient) 